@@ -1,11 +1,20 @@
 from __future__ import annotations
 
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Union
 
 from bot.models.types import Ticker, OrderRequest, Order, Balance
 
 
+class RateLimitError(RuntimeError):
+    """The exchange rejected a request for exceeding its rate limit (e.g. HTTP 429).
+
+    Adapters raise this instead of a generic error so callers can back off and retry
+    without parsing error text.
+    """
+
+
 class ExchangeAdapter(ABC):
     def __init__(self, name: str):
         self.name = name
@@ -22,14 +31,64 @@ class ExchangeAdapter(ABC):
     async def get_ticker(self, symbol: str) -> Ticker:
         raise NotImplementedError
 
+    async def get_last_price(self, symbol: str) -> float:
+        """Last traded price only; adapters may override to skip building a Ticker."""
+        return (await self.get_ticker(symbol)).price
+
+    async def get_price_tick(self, symbol: str) -> Optional[float]:
+        """Minimum price increment for ``symbol``; None when the adapter does not know it."""
+        return None
+
+    async def subscribe_ticker(self, symbol: str, callback: Callable[[Ticker], Any]) -> bool:
+        """Start pushing ticker updates to ``callback``; False when streaming is unsupported."""
+        return False
+
+    async def subscribe_order_updates(self, symbol: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield order update rows for ``symbol``; the default stream is empty (poll instead)."""
+        return
+        yield  # pragma: no cover  (makes this an async generator)
+
     @abstractmethod
     async def place_order(self, order: OrderRequest) -> Order:
         raise NotImplementedError
 
+    async def place_orders_batch(
+        self, orders: Sequence[OrderRequest], concurrency: int = 0
+    ) -> List[Union[Order, BaseException]]:
+        """Submit several orders at once.
+
+        Results are index-aligned with ``orders``; a failed entry holds its exception
+        instead of raising. ``concurrency`` > 0 caps how many requests are in flight.
+        Adapters with a native batch endpoint should override this.
+        """
+        if concurrency <= 0 or concurrency >= len(orders):
+            return list(await asyncio.gather(*(self.place_order(o) for o in orders), return_exceptions=True))
+        sem = asyncio.Semaphore(concurrency)
+
+        async def _one(o: OrderRequest) -> Order:
+            async with sem:
+                return await self.place_order(o)
+
+        return list(await asyncio.gather(*(_one(o) for o in orders), return_exceptions=True))
+
     @abstractmethod
     async def cancel_order(self, order_id: str) -> Order:
         raise NotImplementedError
 
+    async def cancel_orders_batch(
+        self, order_ids: Sequence[str], concurrency: int = 0
+    ) -> List[Union[Order, BaseException]]:
+        """Cancel several orders at once; results are index-aligned like ``place_orders_batch``."""
+        if concurrency <= 0 or concurrency >= len(order_ids):
+            return list(await asyncio.gather(*(self.cancel_order(i) for i in order_ids), return_exceptions=True))
+        sem = asyncio.Semaphore(concurrency)
+
+        async def _one(order_id: str) -> Order:
+            async with sem:
+                return await self.cancel_order(order_id)
+
+        return list(await asyncio.gather(*(_one(i) for i in order_ids), return_exceptions=True))
+
     @abstractmethod
     async def fetch_balances(self) -> List[Balance]:
         raise NotImplementedError
@@ -1,18 +1,199 @@
 from __future__ import annotations
 
 import asyncio
+import inspect
+import json
+import math
 import os
+import random
 import time
+from collections import defaultdict
 from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 
 from loguru import logger
 
 from edgex_sdk import Client as EdgeXClient, OrderSide as SDKOrderSide
 import httpx  # for error detail extraction and public API calls
 
-from bot.adapters.base import ExchangeAdapter
+try:  # WebSocket は SDK のバージョンによって未提供のことがある
+    from edgex_sdk import WebSocketManager
+except ImportError:  # pragma: no cover
+    WebSocketManager = None  # type: ignore[assignment,misc]
+
+try:  # 高速JSONデコード（未導入なら httpx 標準の json にフォールバック）
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore[assignment]
+
+from bot.adapters.base import ExchangeAdapter, RateLimitError
 from bot.models.types import Balance, Order, OrderRequest, OrderSide, OrderStatus, OrderType, Ticker, TimeInForce
+from bot.utils.rate_limiter import AsyncTokenBucket
+
+# ティッカーの短期キャッシュ有効期間（同一秒内の重複取得をまとめる）
+_TICKER_TTL_MS = 250
+
+# 未知の契約IDに対してメタデータを再取得するまでの最短間隔
+_METADATA_TTL_MS = 5 * 60 * 1000
+
+# 刻み情報が無い場合の既定価格刻み
+_DEFAULT_PRICE_TICK = Decimal("0.1")
+
+# 自前のサイド -> SDKのサイド / その文字列表現（発注毎の変換を避ける）
+_SDK_SIDE = {OrderSide.BUY: SDKOrderSide.BUY, OrderSide.SELL: SDKOrderSide.SELL}
+_SDK_SIDE_STR = {k: (v.value if hasattr(v, "value") else str(v)) for k, v in _SDK_SIDE.items()}
+
+# 取消結果の request（呼び出し側は参照しない）。取消毎にモデルを作り直さないよう共有する
+_CANCEL_REQ = OrderRequest(symbol="", side=OrderSide.BUY, type=OrderType.MARKET, quantity=0.0)
+
+
+def _env_decimal(name: str) -> Optional[Decimal]:
+    """Parse a positive Decimal from the environment; None when unset or invalid."""
+    raw = os.getenv(name)
+    if not raw:
+        return None
+    try:
+        val = Decimal(raw)
+    except Exception:
+        return None
+    return val if val > 0 else None
+
+
+def _pow10_exponent(d: Optional[Decimal]) -> Optional[int]:
+    """Return k when ``d == 10**-k`` (k >= 0), e.g. 0.1 -> 1; otherwise None."""
+    if d is None:
+        return None
+    try:
+        t = d.normalize().as_tuple()
+    except Exception:
+        return None
+    if t.digits != (1,) or not isinstance(t.exponent, int) or t.exponent > 0:
+        return None
+    return -t.exponent
+
+
+def _quantize(value: float, tick: Decimal, exp: Optional[int], up: bool) -> float:
+    """Snap `value` to a multiple of `tick` (ceil if `up`, else floor).
+
+    Ticks of the form 10**-k are handled with integer scaling; other ticks fall
+    back to exact Decimal arithmetic.
+    """
+    if exp is not None:
+        scale = 10 ** exp
+        # 浮動小数の誤差（例: 100000.1*10 = 1000000.9999999999）を吸収してから切り上げ/切り下げ
+        x = round(value * scale, 6)
+        units = math.ceil(x) if up else math.floor(x)
+        return units / scale
+    units_dec = (Decimal(str(value)) / tick).to_integral_value(rounding=ROUND_CEILING if up else ROUND_FLOOR)
+    return float(units_dec * tick)
+
+
+def _json_body(resp: httpx.Response) -> Any:
+    """Decode a JSON response body, using orjson when available."""
+    if orjson is not None:
+        try:
+            return orjson.loads(resp.content)
+        except Exception:
+            pass
+    return resp.json()
+
+
+def _ws_last_price(message: Any) -> Optional[float]:
+    """Extract lastPrice from a ticker push (JSON text or already-decoded dict)."""
+    try:
+        if isinstance(message, (str, bytes, bytearray)):
+            message = orjson.loads(message) if orjson is not None else json.loads(message)
+        if not isinstance(message, dict):
+            return None
+        content = message.get("content") if isinstance(message.get("content"), dict) else message
+        data = content.get("data")
+        row = data[0] if isinstance(data, list) and data else data
+        if not isinstance(row, dict):
+            return None
+        return float(row["lastPrice"])
+    except Exception:
+        return None
+
+
+def _ws_order_rows(message: Any) -> List[Dict[str, Any]]:
+    """Extract order rows from a private trade-event push (``content.data.order``)."""
+    try:
+        if isinstance(message, (str, bytes, bytearray)):
+            message = orjson.loads(message) if orjson is not None else json.loads(message)
+        if not isinstance(message, dict):
+            return []
+        content = message.get("content") if isinstance(message.get("content"), dict) else message
+        data = content.get("data")
+        rows = data.get("order") if isinstance(data, dict) else data
+        if isinstance(rows, dict):
+            rows = [rows]
+        return [r for r in (rows or []) if isinstance(r, dict)]
+    except Exception:
+        return []
+
+
+def _retry_after_sec(err: Exception) -> Optional[float]:
+    """Seconds from a Retry-After header on the error's HTTP response, if any."""
+    resp = getattr(err, "response", None)
+    if not isinstance(resp, httpx.Response):
+        return None
+    raw = resp.headers.get("Retry-After")
+    if not raw:
+        return None
+    try:
+        return max(0.0, float(raw))
+    except Exception:
+        return None
+
+
+def _http_status(err: Exception) -> Optional[int]:
+    """HTTP status code carried by an SDK/httpx error, if any."""
+    if isinstance(err, httpx.HTTPStatusError):
+        return err.response.status_code
+    resp = getattr(err, "response", None)
+    return resp.status_code if isinstance(resp, httpx.Response) else None
+
+
+def _error_code(err: Exception) -> Any:
+    """Business error ``code`` from the JSON body of the error's HTTP response, if any."""
+    resp = getattr(err, "response", None)
+    if not isinstance(resp, httpx.Response):
+        return None
+    try:
+        body = resp.json()
+    except Exception:
+        return None
+    return body.get("code") if isinstance(body, dict) else None
+
+
+def _is_cloudflare_challenge(err: Exception) -> bool:
+    """Whether the request was answered by a Cloudflare challenge page (throttling in front of the API)."""
+    resp = getattr(err, "response", None)
+    if isinstance(resp, httpx.Response) and resp.headers.get("cf-mitigated") == "challenge":
+        return True
+    return "Just a moment" in str(err)
+
+
+def _is_rate_limit_error(err: Exception, code: Any = None) -> bool:
+    """Whether an SDK error is a rate-limit rejection.
+
+    Classified from structured data only: HTTP 429, an EdgeX ``rateLimit*`` business
+    code (``code`` if the caller already parsed it, else the response body), a
+    Cloudflare challenge, or the 429 reason phrase.  Digits in the message are never
+    matched, since prices and timestamps would give false positives.
+    """
+    if _http_status(err) == 429:
+        return True
+    if code is None:
+        code = _error_code(err)
+    if "ratelimit" in str(code or "").lower():
+        return True
+    return _is_cloudflare_challenge(err) or "Too Many Requests" in str(err)
+
+
+def _func_key(meth: Any) -> int:
+    """Stable cache key for a (possibly bound) callable: bound methods are re-created on each access."""
+    return id(getattr(meth, "__func__", meth))
 
 
 class EdgeXSDKAdapter(ExchangeAdapter):
@@ -28,9 +209,62 @@ class EdgeXSDKAdapter(ExchangeAdapter):
         self.account_id = int(account_id)
         self.stark_private_key = stark_private_key
         self._client: Optional[EdgeXClient] = None
-        self._market_rules: Dict[str, Dict[str, float]] = {}
+        # 公開API用の共有HTTPクライアント（keep-aliveで接続を再利用）
+        self._http: Optional[httpx.AsyncClient] = None
+        self._market_rules: Dict[str, Dict[str, Any]] = {}
+        # getMetaData の contractList を contractId で索引化したもの（取得は一度にまとめる）
+        self._contract_index: Dict[str, Dict[str, Any]] = {}
+        self._metadata_fetched_at_ms: int = 0
+        # 価格刻み・数量刻みの手動指定（環境変数 > メタデータ）。発注毎のDecimal生成を避けるため一度だけ読む
+        # EDGEX_PRICE_TICK: 価格の最小刻み（例: 0.1）
+        # EDGEX_SIZE_STEP: 数量の最小刻み（例: 0.1）
+        self._env_price_tick_dec: Optional[Decimal] = _env_decimal("EDGEX_PRICE_TICK")
+        self._env_size_step_dec: Optional[Decimal] = _env_decimal("EDGEX_SIZE_STEP")
+        self._env_price_tick_exp: Optional[int] = _pow10_exponent(self._env_price_tick_dec)
+        self._env_size_step_exp: Optional[int] = _pow10_exponent(self._env_size_step_dec)
+        # メイカー保証の設定（発注毎に環境変数を読まない）
+        # EDGEX_STRICT_MAKER: 板が取れない時は発注しない
+        # EDGEX_MAKER_MODE: validate | clamp
+        self._strict_maker: bool = str(os.getenv("EDGEX_STRICT_MAKER", "true")).lower() in ("1", "true", "yes")
+        self._maker_mode: str = str(os.getenv("EDGEX_MAKER_MODE", "validate")).lower()
         # (best_bid, best_ask, ts_ms)
         self._last_depth: Dict[str, Tuple[Optional[float], Optional[float], int]] = {}
+        # 板の再利用期間（1ループ内の一括発注で発注毎に板を取り直さない）。EDGEX_DEPTH_TTL_MS=0 で毎回取得
+        try:
+            self._depth_ttl_ms = int(os.getenv("EDGEX_DEPTH_TTL_MS", "500"))
+        except Exception:
+            self._depth_ttl_ms = 500
+        self._depth_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        # symbol -> (ts_ms, lastPrice)。シンボル毎のロックで同時ミスを1回の取得にまとめる
+        self._ticker_cache: Dict[str, Tuple[int, float]] = {}
+        self._ticker_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        # 公開WebSocket（ティッカー購読）。EDGEX_WS_URL 未指定時は商用既定
+        self._ws_url = os.getenv("EDGEX_WS_URL", "wss://quote.edgex.exchange")
+        self._ws: Any = None
+        # (get_position_transaction_page, 銘柄フィルタの引数名)。初回取得時に一度だけ解決する
+        self._pos_tx_call: Optional[Tuple[Callable[..., Any], Optional[str]]] = None
+        self._ws_public = False
+        self._ws_private = False
+        # 注文WebSocketのハンドラは接続毎に1回だけ登録し、購読中の各ジェネレータのキューへ配る
+        # （購読の度に登録すると再購読でハンドラが積み上がり、読まれないキューへ配り続ける）
+        self._order_queues: List[Tuple[asyncio.AbstractEventLoop, "asyncio.Queue[Dict[str, Any]]"]] = []
+        self._order_handler_registered = False
+        # EdgeXへの全リクエストを共有トークンバケットで平準化（429を受けてから気付くのではなく事前に抑制）
+        # EDGEX_RPS: 1秒あたりの上限（0で無効） / EDGEX_RPS_BURST: 瞬間的に許容する本数
+        try:
+            rps = float(os.getenv("EDGEX_RPS", "10"))
+        except Exception:
+            rps = 10.0
+        try:
+            burst = float(os.getenv("EDGEX_RPS_BURST", "0"))
+        except Exception:
+            burst = 0.0
+        self._bucket = AsyncTokenBucket(rate=rps, burst=burst or None)
+        # SDKメソッドの引数名・list_active_orders用kwargsテンプレートのキャッシュ
+        self._sig_cache: Dict[int, frozenset] = {}
+        self._active_orders_kwargs_cache: Dict[Tuple[int, bool], Tuple[Dict[str, Any], Tuple[str, ...], Tuple[str, ...]]] = {}
+        # cancel_order がCancelOrderParams型を要求するSDKか（一度TypeErrorを見たら以降は最初からそちらで呼ぶ）
+        self._cancel_with_params = False
 
     def _now_ms(self) -> int:
         return int(time.time() * 1000)
@@ -41,19 +275,160 @@ class EdgeXSDKAdapter(ExchangeAdapter):
             account_id=self.account_id,
             stark_private_key=self.stark_private_key,
         )
+        self._http = httpx.AsyncClient(
+            base_url=self.base_url.rstrip("/"),
+            timeout=5.0,
+            headers={"Accept": "application/json"},
+            limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=30),
+        )
 
     async def close(self) -> None:
+        if self._ws is not None:
+            for name in ("disconnect_all", "disconnect_public", "close"):
+                meth = getattr(self._ws, name, None)
+                if callable(meth):
+                    try:
+                        await asyncio.to_thread(meth)
+                    except Exception:
+                        pass
+                    break
+            self._ws = None
+            self._ws_public = self._ws_private = False
+            self._order_handler_registered = False
         if self._client:
             await self._client.close()
             self._client = None
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
 
     async def get_ticker(self, symbol: str) -> Ticker:
+        price = await self.get_last_price(symbol)
+        # 値はアダプタ内で型が揃っているため、検証なしで組み立てる（model_construct）
+        return Ticker.model_construct(symbol=symbol, price=price, ts_ms=self._ticker_cache[str(symbol)][0])
+
+    async def get_last_price(self, symbol: str) -> float:
+        key = str(symbol)
+        cached = self._ticker_cache.get(key)
+        if cached and self._now_ms() - cached[0] < _TICKER_TTL_MS:
+            return cached[1]
+        async with self._ticker_locks[key]:
+            # ロック待ちの間に他のコルーチンが取得済みならそれを返す
+            cached = self._ticker_cache.get(key)
+            if cached and self._now_ms() - cached[0] < _TICKER_TTL_MS:
+                return cached[1]
+            price = await self._fetch_last_price(symbol)
+            self._ticker_cache[key] = (self._now_ms(), price)
+            return price
+
+    async def get_price_tick(self, symbol: str) -> Optional[float]:
+        """発注時の丸めに使う価格刻み（環境変数 > メタデータ > 既定値。place_order と同じ優先順）。"""
+        if self._env_price_tick_dec is not None:
+            return float(self._env_price_tick_dec)
+        rules = await self._get_market_rules(str(symbol))
+        return float(rules.get("_price_tick_dec") or _DEFAULT_PRICE_TICK)
+
+    async def subscribe_ticker(self, symbol: str, callback: Callable[[Ticker], Any]) -> bool:
+        """Subscribe to the public ticker stream; each push refreshes the ticker cache and calls ``callback``.
+
+        Returns False when the SDK has no WebSocket support or the subscription fails,
+        in which case callers should keep polling ``get_ticker``.
+        """
+        if WebSocketManager is None:
+            return False
+        loop = asyncio.get_running_loop()
+        key = str(symbol)
+
+        def _deliver(price: float) -> None:
+            ticker = Ticker.model_construct(symbol=symbol, price=price, ts_ms=self._now_ms())
+            self._ticker_cache[key] = (ticker.ts_ms, price)
+            try:
+                callback(ticker)
+            except Exception as e:
+                logger.debug("ticker callback error: {}", e)
+
+        def _on_message(message: Any) -> None:
+            # SDKの受信スレッドから呼ばれるため、イベントループ側へ受け渡す
+            price = _ws_last_price(message)
+            if price is not None:
+                loop.call_soon_threadsafe(_deliver, price)
+
+        try:
+            ws = self._ws_manager()
+            if not self._ws_public:
+                await asyncio.to_thread(ws.connect_public)
+                self._ws_public = True
+            ws.subscribe_ticker(key, _on_message)
+        except Exception as e:
+            logger.warning("ティッカーWebSocket購読に失敗（ポーリング継続）: {}", e)
+            return False
+        logger.info("ティッカーWebSocket購読開始: symbol={} url={}", key, self._ws_url)
+        return True
+
+    async def subscribe_order_updates(self, symbol: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield raw order rows for ``symbol`` from the private WebSocket stream.
+
+        Ends immediately when the SDK has no WebSocket support or the private
+        connection cannot be established; callers then fall back to REST polling.
+        """
+        if WebSocketManager is None:
+            return
+        queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        key = str(symbol)
+
+        try:
+            ws = self._ws_manager()
+            if not self._ws_private:
+                await asyncio.to_thread(ws.connect_private)
+                self._ws_private = True
+            if not self._order_handler_registered:
+                sub = getattr(ws, "subscribe_order_update", None) or getattr(ws, "subscribe_orders", None)
+                if callable(sub):
+                    sub(self._on_order_message)
+                else:
+                    ws.get_private_client().on_message("trade-event", self._on_order_message)
+                self._order_handler_registered = True
+        except Exception as e:
+            logger.warning("注文WebSocket購読に失敗（REST突合で継続）: {}", e)
+            return
+        entry = (asyncio.get_running_loop(), queue)
+        self._order_queues.append(entry)
+        logger.info("注文WebSocket購読開始: symbol={}", key)
+        try:
+            while True:
+                row = await queue.get()
+                if str(row.get("contractId") or key) == key:
+                    yield row
+        finally:
+            # 購読終了（タスク取消・エンジン停止）後はこのキューへ配らない
+            self._order_queues.remove(entry)
+
+    def _on_order_message(self, message: Any) -> None:
+        """注文WebSocketの受信ハンドラ（接続毎に1つ）。購読中の全キューへ行を配る."""
+        # SDKの受信スレッドから呼ばれるため、各キューのイベントループ側へ受け渡す
+        rows = _ws_order_rows(message)
+        for loop, queue in list(self._order_queues):
+            for row in rows:
+                loop.call_soon_threadsafe(queue.put_nowait, row)
+
+    def _ws_manager(self) -> Any:
+        if self._ws is None:
+            self._ws = WebSocketManager(
+                base_url=self._ws_url,
+                account_id=self.account_id,
+                stark_pri_key=self.stark_private_key,
+            )
+        return self._ws
+
+    async def _fetch_last_price(self, symbol: str) -> float:
         assert self._client is not None
-        # 429/一時エラーに備えてリトライ（指数バックオフ）
+        # 429/一時エラーに備えてリトライ（decorrelated jitter付き指数バックオフ）
+        # 同時に429を受けた複数コルーチンが同じタイミングで再送しないよう待ち時間をばらつかせる
         backoff = 0.5
         last_err: Exception | None = None
         for _ in range(8):
             try:
+                await self._bucket.acquire()
                 resp = await self._client.get_24_hour_quote(str(symbol))
                 data = (resp or {}).get("data") or []
                 price = None
@@ -64,13 +439,20 @@ class EdgeXSDKAdapter(ExchangeAdapter):
                         price = None
                 if price is None:
                     raise ValueError("ticker price not available via SDK")
-                return Ticker(symbol=symbol, price=price, ts_ms=self._now_ms())
+                return price
             except Exception as e:
-                msg = str(e)
                 last_err = e
-                if "429" in msg or "Too Many Requests" in msg or "cloudflare" in msg.lower() or "Just a moment" in msg:
-                    await asyncio.sleep(backoff)
-                    backoff = min(backoff * 1.8, 8.0)
+                if _is_rate_limit_error(e):
+                    # 以降の全リクエストの送信レートも下げる
+                    self._bucket.penalize()
+                    # Retry-After があればそれに従う
+                    wait = _retry_after_sec(e)
+                    if wait is None:
+                        wait = random.uniform(0.2, min(8.0, backoff * 3))
+                    else:
+                        wait = min(wait, 30.0)
+                    await asyncio.sleep(wait)
+                    backoff = max(0.2, wait)
                     continue
                 # それ以外は即時エラー
                 raise
@@ -80,6 +462,18 @@ class EdgeXSDKAdapter(ExchangeAdapter):
         raise RuntimeError("ticker retry exhausted")
 
     async def get_best_bid_ask(self, symbol: str) -> tuple[float | None, float | None]:
+        """EdgeXの板: 直近の取得結果が新しければそれを返す。同時の取得要求は1回にまとめる。"""
+        key = str(symbol)
+        cached = self._last_depth.get(key)
+        if cached and self._now_ms() - cached[2] < self._depth_ttl_ms:
+            return cached[0], cached[1]
+        async with self._depth_locks[key]:
+            cached = self._last_depth.get(key)
+            if cached and self._now_ms() - cached[2] < self._depth_ttl_ms:
+                return cached[0], cached[1]
+            return await self._fetch_best_bid_ask(symbol)
+
+    async def _fetch_best_bid_ask(self, symbol: str) -> tuple[float | None, float | None]:
         """EdgeXの板: SDK→HTTPの順で最大リトライ。成功時は短期キャッシュ。"""
         def _extract_bba(container: Any) -> tuple[float | None, float | None]:
             """Extract (bid, ask) from common depth shapes: dict or list-of-dict."""
@@ -112,6 +506,7 @@ class EdgeXSDKAdapter(ExchangeAdapter):
                 if self._client is not None and hasattr(self._client, "quote"):
                     meth = getattr(self._client.quote, "get_depth", None)
                     if callable(meth):
+                        await self._bucket.acquire()
                         try:
                             resp = await meth(contract_id=str(symbol))  # type: ignore[arg-type]
                         except TypeError:
@@ -123,16 +518,16 @@ class EdgeXSDKAdapter(ExchangeAdapter):
             return None, None
 
         async def _first_from_http() -> tuple[float | None, float | None]:
-            base = self.base_url.rstrip("/")
-            url = f"{base}/api/v1/public/quote/getDepth"
+            if self._http is None:
+                return None, None
             params = {"contractId": str(symbol), "level": "15"}
             try:
-                async with httpx.AsyncClient(timeout=8.0, headers={"Accept": "application/json"}) as client:
-                    r = await client.get(url, params=params)
-                    r.raise_for_status()
-                    body = r.json()
-                    data = body.get("data") if isinstance(body, dict) else None
-                    return _extract_bba(data)
+                await self._bucket.acquire()
+                r = await self._http.get("/api/v1/public/quote/getDepth", params=params)
+                r.raise_for_status()
+                body = _json_body(r)
+                data = body.get("data") if isinstance(body, dict) else None
+                return _extract_bba(data)
             except Exception:
                 return None, None
 
@@ -158,70 +553,83 @@ class EdgeXSDKAdapter(ExchangeAdapter):
 
         return None, None
 
-    async def _get_market_rules(self, contract_id: str) -> Dict[str, float]:
+    async def _load_contract_index(self) -> None:
+        """Fetch exchange metadata once and index its contractList by contractId."""
+        if self._http is None:
+            return
+        try:
+            await self._bucket.acquire()
+            resp = await self._http.get("/api/v1/public/meta/getMetaData", timeout=10.0)
+            resp.raise_for_status()
+            payload = _json_body(resp)
+            data = payload.get("data") if isinstance(payload, dict) else None
+        except Exception as e:
+            # ignore metadata issues and fallback to env/manual
+            logger.debug("metadata fetch failed: {}", e)
+            return
+        index: Dict[str, Dict[str, Any]] = {}
+        if isinstance(data, dict):
+            for c in data.get("contractList") or []:
+                if isinstance(c, dict) and c.get("contractId") is not None:
+                    index[str(c.get("contractId"))] = c
+        self._contract_index = index
+        self._metadata_fetched_at_ms = self._now_ms()
+
+    async def _get_market_rules(self, contract_id: str) -> Dict[str, Any]:
         """Fetch and cache market rules (size step, price tick, min size) for the contract.
 
-        Returns a dict with keys possibly present: size_step, price_tick, min_size.
+        Returns a dict with keys possibly present: size_step, price_tick, min_size,
+        plus pre-built ``_size_step_dec`` / ``_price_tick_dec`` Decimals for rounding and
+        ``_size_step_exp`` / ``_price_tick_exp`` when the increment is a power of ten.
         """
         if contract_id in self._market_rules:
             return self._market_rules[contract_id]
 
-        base = self.base_url.rstrip("/")
-        url = f"{base}/api/v1/public/meta/getMetaData"
-        rules: Dict[str, float] = {}
+        rules: Dict[str, Any] = {}
+        # 未知の契約でも、直近に取得したメタデータがあれば再取得せず索引から引く
+        stale = self._now_ms() - self._metadata_fetched_at_ms > _METADATA_TTL_MS
+        if contract_id not in self._contract_index and stale:
+            await self._load_contract_index()
+        target = self._contract_index.get(contract_id)
+        if not isinstance(target, dict):
+            self._market_rules[contract_id] = rules
+            return rules
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                resp = await client.get(url)
-                resp.raise_for_status()
-                data = resp.json().get("data") if isinstance(resp.json(), dict) else None
-                if not isinstance(data, dict):
-                    self._market_rules[contract_id] = rules
-                    return rules
-                contract_list = data.get("contractList") or []
-                target = None
-                for c in contract_list:
-                    try:
-                        cid = str(c.get("contractId"))
-                        if cid == contract_id:
-                            target = c
-                            break
-                    except Exception:
-                        continue
-                if not isinstance(target, dict):
-                    self._market_rules[contract_id] = rules
-                    return rules
-
-                def _to_float(x: Any) -> Optional[float]:
-                    try:
-                        if x is None:
-                            return None
-                        return float(str(x))
-                    except Exception:
+            def _to_float(x: Any) -> Optional[float]:
+                try:
+                    if x is None:
                         return None
+                    return float(str(x))
+                except Exception:
+                    return None
 
-                # Heuristic key candidates seen in APIs
-                size_step = (
-                    _to_float(target.get("stepSize"))
-                    or _to_float(target.get("quantityStep"))
-                    or _to_float(target.get("sizeStep"))
-                )
-                price_tick = (
-                    _to_float(target.get("tickSize"))
-                    or _to_float(target.get("priceTick"))
-                    or _to_float(target.get("priceStep"))
-                )
-                min_size = (
-                    _to_float(target.get("minOpenSize"))
-                    or _to_float(target.get("minOrderSize"))
-                    or _to_float(target.get("minSize"))
-                )
+            # Heuristic key candidates seen in APIs
+            size_step = (
+                _to_float(target.get("stepSize"))
+                or _to_float(target.get("quantityStep"))
+                or _to_float(target.get("sizeStep"))
+            )
+            price_tick = (
+                _to_float(target.get("tickSize"))
+                or _to_float(target.get("priceTick"))
+                or _to_float(target.get("priceStep"))
+            )
+            min_size = (
+                _to_float(target.get("minOpenSize"))
+                or _to_float(target.get("minOrderSize"))
+                or _to_float(target.get("minSize"))
+            )
 
-                if size_step and size_step > 0:
-                    rules["size_step"] = size_step
-                if price_tick and price_tick > 0:
-                    rules["price_tick"] = price_tick
-                if min_size and min_size > 0:
-                    rules["min_size"] = min_size
+            if size_step and size_step > 0:
+                rules["size_step"] = size_step
+                rules["_size_step_dec"] = Decimal(str(size_step))
+                rules["_size_step_exp"] = _pow10_exponent(rules["_size_step_dec"])
+            if price_tick and price_tick > 0:
+                rules["price_tick"] = price_tick
+                rules["_price_tick_dec"] = Decimal(str(price_tick))
+                rules["_price_tick_exp"] = _pow10_exponent(rules["_price_tick_dec"])
+            if min_size and min_size > 0:
+                rules["min_size"] = min_size
         except Exception:
             # ignore metadata issues and fallback to env/manual
             pass
@@ -238,62 +646,36 @@ class EdgeXSDKAdapter(ExchangeAdapter):
         # 価格未指定の成行相当は0.1%のオフセットで指値化
         price = float(order.price or 0.0)
         if price <= 0:
-            t = await self.get_ticker(contract_id)
+            last = await self.get_last_price(contract_id)
             if order.side == OrderSide.BUY:
-                price = t.price * 1.001
+                price = last * 1.001
             else:
-                price = t.price * 0.999
+                price = last * 0.999
 
         # 価格刻み・数量刻みに合わせて丸める（環境変数 > メタデータ）
-        # EDGEX_PRICE_TICK: 価格の最小刻み（例: 0.1）
-        # EDGEX_SIZE_STEP: 数量の最小刻み（例: 0.1）
         rules = await self._get_market_rules(contract_id)
-        price_tick_env = os.getenv("EDGEX_PRICE_TICK")
-        if price_tick_env:
+        if self._env_price_tick_dec is not None:
+            tick_dec, tick_exp = self._env_price_tick_dec, self._env_price_tick_exp
+        else:
+            tick_dec, tick_exp = rules.get("_price_tick_dec"), rules.get("_price_tick_exp")
+        # 受動化のため: BUYは切り下げ、SELLは切り上げ
+        round_up = order.side != OrderSide.BUY
+        if tick_dec is not None:
             try:
-                tick = Decimal(price_tick_env)
-                if tick > 0:
-                    price_dec = Decimal(str(price)) / tick
-                    # 受動化のため: BUYは切り下げ、SELLは切り上げ
-                    rounded_units = price_dec.to_integral_value(
-                        rounding=ROUND_FLOOR if order.side == OrderSide.BUY else ROUND_CEILING
-                    )
-                    price = float(rounded_units * tick)
-            except Exception:
-                pass
-        elif "price_tick" in rules:
-            try:
-                tick = Decimal(str(rules["price_tick"]))
-                if tick > 0:
-                    price_dec = Decimal(str(price)) / tick
-                    # 受動化のため: BUYは切り下げ、SELLは切り上げ
-                    rounded_units = price_dec.to_integral_value(
-                        rounding=ROUND_FLOOR if order.side == OrderSide.BUY else ROUND_CEILING
-                    )
-                    price = float(rounded_units * tick)
+                price = _quantize(price, tick_dec, tick_exp, up=round_up)
             except Exception:
                 pass
 
         qty = float(order.quantity)
-        size_step_env = os.getenv("EDGEX_SIZE_STEP")
-        if size_step_env:
+        if self._env_size_step_dec is not None:
+            step_dec, step_exp = self._env_size_step_dec, self._env_size_step_exp
+        else:
+            step_dec, step_exp = rules.get("_size_step_dec"), rules.get("_size_step_exp")
+        if step_dec is not None:
             try:
-                step = Decimal(size_step_env)
-                if step > 0:
-                    qty_dec = (Decimal(str(qty)) / step).to_integral_value(rounding=ROUND_FLOOR) * step
-                    if qty_dec <= 0:
-                        qty_dec = step
-                    qty = float(qty_dec)
-            except Exception:
-                pass
-        elif "size_step" in rules:
-            try:
-                step = Decimal(str(rules["size_step"]))
-                if step > 0:
-                    qty_dec = (Decimal(str(qty)) / step).to_integral_value(rounding=ROUND_FLOOR) * step
-                    if qty_dec <= 0:
-                        qty_dec = step
-                    qty = float(qty_dec)
+                qty = _quantize(qty, step_dec, step_exp, up=False)
+                if qty <= 0:
+                    qty = float(step_dec)
             except Exception:
                 pass
 
@@ -310,29 +692,25 @@ class EdgeXSDKAdapter(ExchangeAdapter):
             best_bid, best_ask = await self.get_best_bid_ask(contract_id)
         except Exception:
             best_bid, best_ask = None, None
-        try:
-            _tick_env = os.getenv("EDGEX_PRICE_TICK")
-            tick_val = float(_tick_env) if _tick_env else float(rules.get("price_tick", 0.1))
-            if tick_val <= 0:
-                tick_val = 0.1
-        except Exception:
-            tick_val = 0.1
+        if tick_dec is None:
+            tick_dec, tick_exp = _DEFAULT_PRICE_TICK, 1
+        snap_tick = tick_dec
 
-        strict_maker = str(os.getenv("EDGEX_STRICT_MAKER", "true")).lower() in ("1", "true", "yes")
+        strict_maker = self._strict_maker
 
         orig_price_before_guard = price
-        maker_mode = str(os.getenv("EDGEX_MAKER_MODE", "validate")).lower()  # validate | clamp
+        maker_mode = self._maker_mode
         # validate: 価格はそのまま（丸めのみ）。食い込みならエラー
         # clamp: best±tickへ寄せる（従来動作）
         if maker_mode == "clamp":
             if order.side == OrderSide.BUY and best_ask is not None:
                 try:
-                    price = min(price, float(Decimal(str(best_ask)) - Decimal(str(tick_val))))
+                    price = min(price, float(Decimal(str(best_ask)) - snap_tick))
                 except Exception:
                     pass
             elif order.side == OrderSide.SELL and best_bid is not None:
                 try:
-                    price = max(price, float(Decimal(str(best_bid)) + Decimal(str(tick_val))))
+                    price = max(price, float(Decimal(str(best_bid)) + snap_tick))
                 except Exception:
                     pass
 
@@ -356,31 +734,21 @@ class EdgeXSDKAdapter(ExchangeAdapter):
 
         # 刻みへ最終スナップ（サイドに応じて受動側へ寄せる）
         try:
-            tick = Decimal(str(tick_val))
-            price_dec = Decimal(str(price)) / tick
-            rounded_units = price_dec.to_integral_value(
-                rounding=ROUND_FLOOR if order.side == OrderSide.BUY else ROUND_CEILING
-            )
-            price = float(rounded_units * tick)
+            price = _quantize(price, snap_tick, tick_exp, up=round_up)
         except Exception:
             pass
 
-        side = SDKOrderSide.BUY if order.side == OrderSide.BUY else SDKOrderSide.SELL
-        payload = {"contract_id": contract_id, "size": str(qty), "price": str(price), "side": side.value if hasattr(side, "value") else str(side)}
+        side = _SDK_SIDE[order.side]
+        payload = {"contract_id": contract_id, "size": str(qty), "price": str(price), "side": _SDK_SIDE_STR[order.side]}
 
         # SDKの引数名差異に対応: post-only/time-in-forceを可能なら渡す
         extra_params: Dict[str, Any] = {}
-        try:
-            import inspect as _inspect
-            sig = _inspect.signature(self._client.create_limit_order)
-            names = set(sig.parameters.keys())
-        except Exception:
-            names = set()
+        names = self._param_names(self._client.create_limit_order)
 
         is_post_only = (order.time_in_force == TimeInForce.POST_ONLY)
         tif_str = None
         if order.time_in_force is not None:
-            tif_str = str(order.time_in_force.value if hasattr(order.time_in_force, "value") else order.time_in_force)
+            tif_str = order.time_in_force.value
         if "post_only" in names:
             extra_params["post_only"] = is_post_only
         if "postOnly" in names:
@@ -397,19 +765,20 @@ class EdgeXSDKAdapter(ExchangeAdapter):
             if "order_type" in names and "order_type" not in extra_params:
                 extra_params["order_type"] = "LIMIT_MAKER"
 
-        logger.debug(
+        logger.opt(lazy=True).debug(
             "maker_guard: mode={} side={} orig_price={} best_bid={} best_ask={} tick={} final_price={} post_only={} strict={}",
-            maker_mode,
-            order.side,
-            orig_price_before_guard,
-            best_bid,
-            best_ask,
-            tick_val,
-            price,
-            is_post_only,
-            strict_maker,
+            lambda: maker_mode,
+            lambda: order.side,
+            lambda: orig_price_before_guard,
+            lambda: best_bid,
+            lambda: best_ask,
+            lambda: float(snap_tick),
+            lambda: price,
+            lambda: is_post_only,
+            lambda: strict_maker,
         )
         try:
+            await self._bucket.acquire()
             res = await self._client.create_limit_order(
                 contract_id=contract_id,
                 size=str(qty),
@@ -457,11 +826,18 @@ class EdgeXSDKAdapter(ExchangeAdapter):
                 detail["raw_error"] = str(e)
             if status_code is not None:
                 detail["status"] = status_code
+            # EdgeXはレート制限を業務エラーコード（rateLimit / rateLimitWindows 等）で返すこともある。
+            # 判定は共通の分類器で行い、価格等を含む detail の文言では判定しない
+            if status_code == 429 or _is_rate_limit_error(e, code=detail.get("code")):
+                # レート制限: 以降の全リクエストの送信レートを下げ、呼び出し側が再試行できる型で返す
+                self._bucket.penalize()
+                raise RateLimitError(f"edgex order rate-limited: {detail}") from e
 
             # Raise a concise but rich message
             raise RuntimeError(f"edgex order failed: {detail}") from e
         order_id = str(((res or {}).get("data") or {}).get("orderId") or "")
-        return Order(
+        # 発注結果も検証済みの値だけで作るため model_construct で検証を省く（発注毎のホットパス）
+        return Order.model_construct(
             id=order_id,
             request=order,
             status=OrderStatus.NEW,
@@ -470,21 +846,44 @@ class EdgeXSDKAdapter(ExchangeAdapter):
             ts_ms=self._now_ms(),
         )
 
+    async def fetch_position_transactions(self, contract_id: Optional[str] = None, size: int = 100) -> List[Dict[str, Any]]:
+        """Latest position transactions (closed-PnL rows) from the account API, optionally for one contract."""
+        meth, filter_key = self._position_tx_call()
+        kwargs: Dict[str, Any] = {"account_id": self.account_id, "size": str(size)}
+        if contract_id is not None and filter_key is not None:
+            kwargs[filter_key] = [str(contract_id)]
+        await self._bucket.acquire()
+        res = await meth(**kwargs)
+        data = (res or {}).get("data") or {}
+        rows = [r for r in (data.get("dataList") or []) if isinstance(r, dict)]
+        if contract_id is not None:
+            rows = [r for r in rows if str(r.get("contractId") or contract_id) == str(contract_id)]
+        return rows
+
     async def cancel_order(self, order_id: str) -> Order:
         assert self._client is not None
         # SDKはCancelOrderParams型を内部で扱うが、単純引数でもラップされる実装が多い
         try:
-            await self._client.cancel_order(order_id=order_id)  # type: ignore[arg-type]
-        except TypeError:
-            # フォールバック: 明示引数名が必要な実装向け
-            from edgex_sdk import CancelOrderParams  # lazy import
+            if not self._cancel_with_params:
+                await self._bucket.acquire()
+                try:
+                    await self._client.cancel_order(order_id=order_id)  # type: ignore[arg-type]
+                except TypeError:
+                    # 明示の引数型が必要な実装: 呼び方を覚えて以降は1回の取消を1リクエストにする
+                    self._cancel_with_params = True
+            if self._cancel_with_params:
+                from edgex_sdk import CancelOrderParams  # lazy import
 
-            await self._client.cancel_order(CancelOrderParams(order_id=order_id))
+                # フォールバックの呼び出しも共有のレート制御を通す
+                await self._bucket.acquire()
+                await self._client.cancel_order(CancelOrderParams(order_id=order_id))
+        except Exception as e:
+            self._raise_if_rate_limited(e, f"cancel {order_id}")
+            raise
 
-        req = OrderRequest(symbol="", side=OrderSide.BUY, type=OrderType.MARKET, quantity=0.0)
-        return Order(
+        return Order.model_construct(
             id=order_id,
-            request=req,
+            request=_CANCEL_REQ,
             status=OrderStatus.CANCELED,
             filled_quantity=0.0,
             average_price=0.0,
@@ -494,6 +893,76 @@ class EdgeXSDKAdapter(ExchangeAdapter):
     async def fetch_balances(self) -> List[Balance]:
         raise NotImplementedError
 
+    def _position_tx_call(self) -> Tuple[Callable[..., Any], Optional[str]]:
+        """ポジション取引履歴APIと銘柄フィルタ引数名を解決する（毎回のgetattr/シグネチャ判定を避ける）。"""
+        if self._pos_tx_call is not None:
+            return self._pos_tx_call
+        assert self._client is not None
+        meth = getattr(getattr(self._client, "account", None), "get_position_transaction_page", None)
+        if not callable(meth):
+            meth = getattr(self._client, "get_position_transaction_page", None)
+        if not callable(meth):
+            raise RuntimeError("SDK does not expose account.get_position_transaction_page")
+        names = self._param_names(meth)
+        filter_key = next((k for k in ("filter_contract_id_list", "filterContractIdList") if k in names), None)
+        self._pos_tx_call = (meth, filter_key)
+        return self._pos_tx_call
+
+    def _param_names(self, meth: Any) -> frozenset:
+        """SDKメソッドの引数名集合（実行中に変わらないため関数単位でキャッシュ）。"""
+        key = _func_key(meth)
+        names = self._sig_cache.get(key)
+        if names is None:
+            try:
+                names = frozenset(inspect.signature(meth).parameters.keys())
+            except Exception:
+                names = frozenset()
+            self._sig_cache[key] = names
+        return names
+
+    def _build_active_orders_kwargs(
+        self, names: frozenset, with_symbol: bool
+    ) -> Tuple[Dict[str, Any], Tuple[str, ...], Tuple[str, ...]]:
+        """Build the kwargs template for legacy `get_active_order_page` variants.
+
+        Returns (static kwargs, list-valued symbol keys, scalar symbol keys); the
+        symbol values are filled in per call.
+        """
+        params: Dict[str, Any] = {}
+        if "account_id" in names:
+            params["account_id"] = self.account_id
+        elif "accountId" in names:
+            params["accountId"] = str(self.account_id)
+        sym_list_keys: Tuple[str, ...] = ()
+        sym_keys: Tuple[str, ...] = ()
+        if with_symbol:
+            sym_list_keys = tuple(k for k in ("contract_id_list", "contractIdList", "contractIds", "symbols") if k in names)
+            sym_keys = tuple(k for k in ("contract_id", "contractId", "symbol") if k in names)
+        # status/state variants
+        if "state" in names:
+            params["state"] = "OPEN"
+        if "status" in names:
+            params["status"] = "OPEN"
+        if "statusList" in names:
+            params["statusList"] = ["OPEN"]
+        if "filterStatusList" in names:
+            params["filterStatusList"] = ["OPEN"]
+        if "size" in names:
+            params["size"] = 200
+        if "pageSize" in names:
+            params["pageSize"] = 200
+        if "page" in names:
+            params["page"] = 1
+        if "pageNum" in names:
+            params["pageNum"] = 1
+        return params, sym_list_keys, sym_keys
+
+    def _raise_if_rate_limited(self, err: Exception, what: str) -> None:
+        """レート制限のエラーなら送信レートを下げて RateLimitError として送出する（それ以外は何もしない）。"""
+        if _is_rate_limit_error(err):
+            self._bucket.penalize()
+            raise RateLimitError(f"edgex {what} rate-limited: {err}") from err
+
     async def list_active_orders(self, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
         """Return currently active (open) orders for the account.
 
@@ -522,8 +991,10 @@ class EdgeXSDKAdapter(ExchangeAdapter):
                     params_obj.filter_contract_id_list = [str(symbol)]
                 logger.debug("list_active_orders: using order.get_active_orders with params_obj={}", params_obj)
                 try:
+                    await self._bucket.acquire()
                     resp = await client.order.get_active_orders(params_obj)  # type: ignore[arg-type]
                 except Exception as e:
+                    self._raise_if_rate_limited(e, "list_active_orders")
                     logger.debug("get_active_orders failed: {}", e)
                     resp = None
 
@@ -537,51 +1008,20 @@ class EdgeXSDKAdapter(ExchangeAdapter):
             if meth is None:
                 return []
 
-            import inspect as _inspect
-            params: Dict[str, Any] = {}
-            try:
-                sig = _inspect.signature(meth)
-                names = sig.parameters.keys()
-            except Exception:
-                names = []
-
-            if "account_id" in names:
-                params["account_id"] = self.account_id
-            elif "accountId" in names:
-                params["accountId"] = str(self.account_id)
+            names = self._param_names(meth)
+            tmpl_key = (_func_key(meth), bool(symbol))
+            template = self._active_orders_kwargs_cache.get(tmpl_key)
+            if template is None:
+                template = self._build_active_orders_kwargs(names, bool(symbol))
+                self._active_orders_kwargs_cache[tmpl_key] = template
+            static_params, sym_list_keys, sym_keys = template
+            params: Dict[str, Any] = dict(static_params)
             if symbol:
                 sym = str(symbol)
-                if "contract_id_list" in names:
-                    params["contract_id_list"] = [sym]
-                if "contractIdList" in names:
-                    params["contractIdList"] = [sym]
-                if "contractIds" in names:
-                    params["contractIds"] = [sym]
-                if "contract_id" in names:
-                    params["contract_id"] = sym
-                if "contractId" in names:
-                    params["contractId"] = sym
-                if "symbol" in names:
-                    params["symbol"] = sym
-                if "symbols" in names:
-                    params["symbols"] = [sym]
-            # status/state variants
-            if "state" in names and "state" not in params:
-                params["state"] = "OPEN"
-            if "status" in names and "status" not in params:
-                params["status"] = "OPEN"
-            if "statusList" in names and "statusList" not in params:
-                params["statusList"] = ["OPEN"]
-            if "filterStatusList" in names and "filterStatusList" not in params:
-                params["filterStatusList"] = ["OPEN"]
-            if "size" in names and "size" not in params:
-                params["size"] = 200
-            if "pageSize" in names and "pageSize" not in params:
-                params["pageSize"] = 200
-            if "page" in names and "page" not in params:
-                params["page"] = 1
-            if "pageNum" in names and "pageNum" not in params:
-                params["pageNum"] = 1
+                for k in sym_list_keys:
+                    params[k] = [sym]
+                for k in sym_keys:
+                    params[k] = sym
 
             if "params" in names and len(names) == 1:
                 call_params = {
@@ -596,15 +1036,19 @@ class EdgeXSDKAdapter(ExchangeAdapter):
                 call_params["filterStatusList"] = ["OPEN"]
                 try:
                     logger.debug("list_active_orders: calling {} with params={} (single-dict)", getattr(meth, "__name__", str(meth)), call_params)
+                    await self._bucket.acquire()
                     resp = await meth(params=call_params)  # type: ignore[arg-type]
                 except Exception as e:
+                    self._raise_if_rate_limited(e, "list_active_orders")
                     logger.debug("get_active_order_page(params=) failed: {}", e)
                     resp = None
             else:
                 try:
                     logger.debug("list_active_orders: calling {} with kwargs={} (named)", getattr(meth, "__name__", str(meth)), params)
+                    await self._bucket.acquire()
                     resp = await meth(**params) if params else await meth()
                 except Exception as e:
+                    self._raise_if_rate_limited(e, "list_active_orders")
                     logger.debug("get_active_order_page failed: {}", e)
                     resp = None
 
@@ -629,12 +1073,12 @@ class EdgeXSDKAdapter(ExchangeAdapter):
                 rows_raw = data
             else:
                 rows_raw = []
-            logger.debug(
+            logger.opt(lazy=True).debug(
                 "list_active_orders: resp_keys={} data_type={} rows_type={} rows_len={}",
-                (list(resp.keys()) if isinstance(resp, dict) else None),
-                type(data).__name__,
-                type(rows_raw).__name__,
-                (len(rows_raw) if isinstance(rows_raw, list) else None),
+                lambda: (list(resp.keys()) if isinstance(resp, dict) else None),
+                lambda: type(data).__name__,
+                lambda: type(rows_raw).__name__,
+                lambda: (len(rows_raw) if isinstance(rows_raw, list) else None),
             )
         except Exception:
             rows_raw = []
@@ -4,15 +4,206 @@ Grid Trading Engine
 """
 
 import asyncio
+from bisect import bisect_left
+from decimal import Decimal
 import os
-from typing import Dict, Optional
+import random
+from typing import Dict, List, Optional, Sequence, Set, Tuple
 import time
 from loguru import logger
+from sortedcontainers import SortedDict, SortedList
 
-from bot.adapters.base import ExchangeAdapter
-from bot.models.types import OrderRequest, OrderSide, OrderType, TimeInForce
+from bot.adapters.base import ExchangeAdapter, RateLimitError
+from bot.models.types import OrderRequest, OrderSide, OrderType, Ticker, TimeInForce
+from bot.utils.rate_limiter import backoff_delay
 from bot.utils.trade_logger import TradeLogger
 
+
+def _px_scale(tick: float) -> float:
+    """価格キーのスケール（1USDあたりのティック数）。刻み0.01なら100、0.5なら2。"""
+    scale = 1.0 / tick
+    # 1/tick が整数なら整数にそろえ、key/scale で刻みちょうどの価格に戻るようにする
+    return float(round(scale)) if abs(scale - round(scale)) < 1e-9 else scale
+
+
+def _decimal_tick(*values: float) -> float:
+    """全ての値を正確に表せる最小の10進刻み（例: 100と0.5なら0.1）。価格刻みが不明な時の代用。"""
+    places = 0
+    for v in values:
+        exp = Decimal(repr(float(v))).normalize().as_tuple().exponent
+        if isinstance(exp, int):
+            places = max(places, -exp)
+    return 10.0 ** -places
+
+
+def _px_key(px: float, scale: float) -> int:
+    """Integer key (ticks) for a price, so float drift cannot split one level into two keys."""
+    return int(round(px * scale))
+
+
+def _key_px(key: int, scale: float) -> float:
+    """Inverse of :func:`_px_key`; only used at the boundary where an order price is needed."""
+    return key / scale
+
+
+def _row_order_id(row) -> Optional[str]:
+    """取引所の注文行（dict または Order 相当のオブジェクト）から注文IDを取り出す。"""
+    if isinstance(row, dict):
+        oid = (
+            row.get("orderId")
+            or row.get("id")
+            or row.get("order_id")
+            or row.get("clientOrderId")
+            or row.get("client_order_id")
+        )
+    else:
+        oid = getattr(row, "id", None) or getattr(row, "orderId", None)
+    return str(oid) if oid else None
+
+
+def _row_side_key(row, scale: float) -> Optional[Tuple[OrderSide, int]]:
+    """OPEN注文一覧の1行から (サイド, 価格キー) を取り出す（dict以外・サイド/価格不明ならNone）。"""
+    if not isinstance(row, dict):
+        return None
+    try:
+        raw = row.get("price") or row.get("px") or row.get("0")
+        if raw is None:
+            return None
+        key = _px_key(float(raw), scale)
+    except Exception:
+        return None
+    s = str(row.get("side") or row.get("orderSide") or "").upper()
+    if s in ("BUY", "LONG"):
+        return OrderSide.BUY, key
+    if s in ("SELL", "SHORT"):
+        return OrderSide.SELL, key
+    return None
+
+
+def _sorted_has_within(keys: Sequence[int], key: int, span: int) -> bool:
+    """昇順の ``keys`` に ``key`` との差が ``span`` 未満の値があればTrue（両隣だけを二分探索で見る）。
+
+    SortedList と SortedDict.keys() のどちらも渡せるよう、標準の bisect で挿入位置を求める。
+    """
+    i = bisect_left(keys, key)
+    if i < len(keys) and keys[i] - key < span:
+        return True
+    return i > 0 and key - keys[i - 1] < span
+
+
+def _is_rate_limited(e: BaseException) -> bool:
+    """レート制限による失敗か。待てば通る一時的なエラーだけを再試行の対象にする.
+
+    文言では判定しない（エラー文に含まれる価格や時刻の "429" で誤判定し、約定し得た注文を再送しないため）。
+    アダプタが判定して送出する RateLimitError だけを対象にする。
+    """
+    return isinstance(e, RateLimitError)
+
+
+def _fmt_orders(orders: List[Tuple[float, str]]) -> str:
+    """(価格, 注文ID) の並びをログ用に "$価格(ID=...)" の列へ整形する。"""
+    return ", ".join(f"${px:.1f}(ID={oid})" for px, oid in orders)
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float setting from the environment; unset or malformed values fall back to ``default``."""
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an int setting from the environment; unset or malformed values fall back to ``default``."""
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Read a boolean flag ("1"/"true"/"yes") from the environment."""
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    return raw.lower() in ("1", "true", "yes")
+
+
+class _PriceBook(SortedDict):
+    """片側の発注済み注文: 整数キー(_px_key) -> (価格, 注文ID)。キー順（=価格順）に保持する.
+
+    注文ID -> キーの逆引きも同時に保持し、約定判定を集合演算だけで行えるようにする。
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        self._key_by_oid: Dict[str, int] = {}
+        super().__init__(*args, **kwargs)
+        # 初期データは dict.update で入るため逆引きをまとめて作る
+        self._key_by_oid = {oid: k for k, (_, oid) in self.items()}
+
+    def __setitem__(self, key: int, value: Tuple[float, str]) -> None:
+        old = self.get(key)
+        if old is not None:
+            self._key_by_oid.pop(old[1], None)
+        super().__setitem__(key, value)
+        self._key_by_oid[value[1]] = key
+
+    def __delitem__(self, key: int) -> None:
+        _, oid = self[key]
+        super().__delitem__(key)
+        self._key_by_oid.pop(oid, None)
+
+    def pop(self, key: int, *default):
+        if key in self:
+            self._key_by_oid.pop(self[key][1], None)
+        return super().pop(key, *default)
+
+    def popitem(self, index: int = -1):
+        key, value = super().popitem(index)
+        self._key_by_oid.pop(value[1], None)
+        return key, value
+
+    def clear(self) -> None:
+        super().clear()
+        self._key_by_oid.clear()
+
+    def add(self, key: int, px: float, order_id: str) -> None:
+        self[key] = (px, order_id)
+
+    def min_px(self) -> float:
+        return self.peekitem(0)[1][0]
+
+    def max_px(self) -> float:
+        return self.peekitem(-1)[1][0]
+
+    def has_within(self, key: int, span: int) -> bool:
+        """``key`` との差が ``span`` 未満のキーが1つでもあればTrue（二分探索）。"""
+        return _sorted_has_within(self.keys(), key, span)
+
+    def prices(self) -> List[float]:
+        return [px for px, _ in self.values()]
+
+    def order_ids(self):
+        """発注済み注文IDの集合ビュー（``-`` / ``&`` で集合演算できる）。"""
+        return self._key_by_oid.keys()
+
+    def pop_order(self, order_id: str) -> Optional[Tuple[float, str]]:
+        """IDの注文を逆引きで1件取り除く（無ければNone）。"""
+        key = self._key_by_oid.get(order_id)
+        return None if key is None else self.pop(key)
+
+    def pop_orders(self, order_ids) -> List[Tuple[float, str]]:
+        """指定IDの注文を取り除き、価格順の (価格, 注文ID) を返す。"""
+        keys = sorted(self._key_by_oid[oid] for oid in order_ids if oid in self._key_by_oid)
+        return [self.pop(k) for k in keys]
+
+
+def _has_min_gap(step_ticks: int, side_map: _PriceBook, key: int) -> bool:
+    """Return True if price key `key` is at least `step_ticks` away from all existing keys in `side_map`."""
+    # 整数キー同士で比較する（float差分と1e-9の許容誤差に頼らない）。±N範囲の有無だけを二分探索で見る
+    return not side_map.has_within(key, step_ticks)
+
+
 class GridEngine:
     """**STEP毎に両サイドへグリッド指値を差し続けなくしたエンジン.
     
@@ -33,13 +224,24 @@ class GridEngine:
         self.poll_interval_sec = max(1.5, float(poll_interval_sec))
         self._running = False
         self._loop_iter: int = 0
+        # エンジン内で使うロガー（symbol等のコンテキストを一度だけbind）
+        self._log = logger.bind(component="grid", symbol=symbol)
 
         self.size = float(os.getenv("EDGEX_GRID_SIZE", os.getenv("EDGEX_SIZE", "0.01")))
         self.step = float(os.getenv("EDGEX_GRID_STEP_USD", "100"))
         # 両側の価格幅(固定) だけ使い込む
         self.first_offset = float(os.getenv("EDGEX_GRID_FIRST_OFFSET_USD", "100"))
         self.levels = int(os.getenv("EDGEX_GRID_LEVELS_PER_SIDE", "5"))
-        logger.info(
+        # 価格からのオフセット列は設定値だけで決まるため一度だけ作る
+        # アンカー方式: X, X+N, ..., X+(levels-1)N / BIN: N, 2N, ..., levels*N
+        self._anchor_offsets = tuple(self.first_offset + i * self.step for i in range(self.levels))
+        # 毎ループの中心丸めは除算ではなく逆数の乗算で行う（step<=0 は配置しないため0で代用）
+        self._step_inv = 1.0 / self.step if self.step > 0 else 0.0
+        # 価格キーの刻み。起動時に取引所の価格刻みで決め直す（取れるまでは設定値を正確に表せる10進刻み）
+        self._set_price_tick(_decimal_tick(self.step, self.first_offset))
+        # BIN: 台帳が目標と一致した時の (中心キー, 買い本数, 売り本数)。同じなら次回の差分計算を省く
+        self._last_ensure_key: Optional[Tuple[int, int, int]] = None
+        self._log.info(
             "グリッド設定: グリッド幅={}USD 初回オフセット={}USD レベル数={} サイズ={}BTC",
             self.step,
             self.first_offset,
@@ -47,210 +249,405 @@ class GridEngine:
             self.size,
         )
 
-        # レート制限回避のための遅延時間調整
-        try:
-            # シンプル高速モードでは既定を短めにする（必要なら環境変数で上書き）
-            self.op_spacing_sec = float(os.getenv("EDGEX_GRID_OP_SPACING_SEC", "0.4"))
-        except Exception:
-            self.op_spacing_sec = 0.4
+        # ループ間の最小待機時間。発注/取消の間隔はアダプタ側のトークンバケット（429で自動減速）が制御する
+        # シンプル高速モードでは既定を短めにする（必要なら環境変数で上書き）
+        self.op_spacing_sec = _env_float("EDGEX_GRID_OP_SPACING_SEC", 0.4)
+        # 同時に送信中にする発注の上限（バッチ内の並列度）。全体のレートはアダプタ側のトークンバケットで制御
+        self.max_concurrent_orders = _env_int("EDGEX_GRID_MAX_CONCURRENT_ORDERS", 5)
+        # レート制限で弾かれた発注/取消/一覧取得の再試行（指数バックオフ: base*2^n 秒、上限cap秒）
+        self.retry_attempts = max(1, _env_int("EDGEX_GRID_RETRY_ATTEMPTS", 3))
+        self.retry_base_sec = _env_float("EDGEX_GRID_RETRY_BASE_SEC", 0.25)
+        self.retry_cap_sec = _env_float("EDGEX_GRID_RETRY_CAP_SEC", 2.0)
 
         # 初回配置済みフラグ（複数回はfirst_offsetは適用しない一度だけ）
         self.initialized = False
 
-        # 既に出した価格（重複防止）
-        self.placed_buy_px_to_id: Dict[float, str] = {}
-        self.placed_sell_px_to_id: Dict[float, str] = {}
+        # 既に出した価格（重複防止）: 整数キー(価格刻み単位, _px_key) -> (価格, 注文ID)
+        # floatをそのままキーにすると丸め誤差で同じ価格が別キーになるため整数化する
+        # キー順に保持し、最も近い/遠い注文を全走査せずに取り出す
+        self.placed_buy_px_to_id = _PriceBook()
+        self.placed_sell_px_to_id = _PriceBook()
+
+        # 発注リクエストの雛形（サイド毎）。発注毎は価格だけ差し替えてコピーし、モデル検証を省く
+        self._req_proto: Dict[OrderSide, OrderRequest] = {
+            side: OrderRequest(
+                symbol=self.symbol,
+                side=side,
+                type=OrderType.LIMIT,
+                quantity=self.size,
+                price=None,
+                time_in_force=TimeInForce.POST_ONLY,  # ← MAKER注文（手数料リベート）
+            )
+            for side in (OrderSide.BUY, OrderSide.SELL)
+        }
 
         self.tlog = TradeLogger()
         # closed PnL poll interval (sec). 0 to disable.
-        try:
-            self.closed_poll_sec = float(os.getenv("EDGEX_GRID_CLOSED_PNL_SEC", "30"))
-        except Exception:
-            self.closed_poll_sec = 30.0
-        self._last_closed_id: str | None = None
-        self._last_closed_poll_ts: float = 0.0
+        self.closed_poll_sec = _env_float("EDGEX_GRID_CLOSED_PNL_SEC", 30.0)
+        # 取り込み済みの最大ID（数値で比較。文字列比較だと "10" < "9" になる）
+        self._last_closed_id: int | None = None
+        # クローズ済みPnLの取得関数（アダプタ非対応ならNone）。ポーリング毎に属性探索しない
+        self._fetch_closed = getattr(adapter, "fetch_position_transactions", None)
+        # メインループとは独立した定期タスク（メインループ側で毎回の時刻判定をしない）
+        self._closed_pnl_task: Optional[asyncio.Task] = None
 
         # 既存の“このBotが出していない注文”を徐々に整理して、levels本に保つ
-        try:
-            self.enforce_levels = str(os.getenv("EDGEX_GRID_ENFORCE_LEVELS", "1")).lower() in ("1", "true", "yes")
-        except Exception:
-            self.enforce_levels = True
+        self.enforce_levels = _env_bool("EDGEX_GRID_ENFORCE_LEVELS", True)
+        # 1ループで取り消す余剰注文の上限（1回のバッチ取消で送る）
+        self.excess_cancel_per_loop = max(1, _env_int("EDGEX_GRID_EXCESS_CANCEL_PER_LOOP", 3))
 
         # 1ループあたりの新規発注上限（片側）: 明示指定があれば適用（任意）
-        try:
-            self.max_new_per_loop = int(os.getenv("EDGEX_GRID_MAX_NEW_PER_LOOP", "0"))
-        except Exception:
-            self.max_new_per_loop = 0
+        self.max_new_per_loop = _env_int("EDGEX_GRID_MAX_NEW_PER_LOOP", 0)
 
         # シンプルモード（余計な挙動を排し、配置を高速化）
-        try:
-            self.simple_mode = str(os.getenv("EDGEX_GRID_SIMPLE", "1")).lower() in ("1", "true", "yes")
-        except Exception:
-            self.simple_mode = True
+        self.simple_mode = _env_bool("EDGEX_GRID_SIMPLE", True)
 
         # 実注文の同期周期（ループ何回に1回か）。BINモードでの整合性確保用
-        try:
-            self.active_sync_every = int(os.getenv("EDGEX_GRID_ACTIVE_SYNC_EVERY", "3"))
-        except Exception:
-            self.active_sync_every = 3
+        self.active_sync_every = _env_int("EDGEX_GRID_ACTIVE_SYNC_EVERY", 3)
 
         # ビン固定モード: 価格を N 刻みの絶対グリッドに揃える（例: 110000, 110100, 110200 ...）
         # ループ毎に現在価格から目標ビン集合を作り、差分で発注/取消のみ行う
-        try:
-            self.bin_mode = str(os.getenv("EDGEX_GRID_BIN_MODE", "1")).lower() in ("1", "true", "yes")
-        except Exception:
-            self.bin_mode = True
+        self.bin_mode = _env_bool("EDGEX_GRID_BIN_MODE", True)
 
         # 価格追従（乖離補正）設定（シンプルモードでは既定OFF）
+        self.follow_enable = _env_bool("EDGEX_GRID_FOLLOW_ENABLE", not self.simple_mode)
+        # X からの許容バンドを N ステップ分だけ広げる（例: 1 -> X+1*N までは許容）
+        self.follow_slack_steps = _env_int("EDGEX_GRID_FOLLOW_SLACK_STEPS", 1)
+        # 1ループで寄せる最大本数（過度な再配置を抑制）
+        self.max_shift_per_loop = _env_int("EDGEX_GRID_MAX_SHIFT_PER_LOOP", 1)
+
+        # ティッカーWebSocket購読（対応アダプタのみ）。有効時は価格取得をHTTPポーリングから置き換える
+        self.ws_enable = _env_bool("EDGEX_GRID_WS", True)
+        self._streaming = False
+        # 最新のストリーム価格とその受信時刻（monotonic）。待たずに読み、古ければHTTPの板ミッドに戻す
+        self._stream_px: Optional[float] = None
+        self._stream_px_ts: float = 0.0
+        self.stream_stale_sec = _env_float("EDGEX_GRID_STREAM_STALE_SEC", self.poll_interval_sec * 2)
+        # 注文WebSocketからの約定通知（注文ID）。ストリームが生きている間はRESTの全件突合を間引く
+        self._fill_queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._order_stream_alive = False
+        self._order_stream_task: Optional[asyncio.Task] = None
+        # 約定通知、またはストリーム価格が前回ループの中値からN以上動いたらループを早起きさせる。
+        # 約定で起きた場合は EDGEX_GRID_FILL_COALESCE_MS だけ待ち、同時約定をまとめて補充する
+        self._wake_event = asyncio.Event()
+        self._tick_mid_key: Optional[int] = None
+        self._stream_px_key: Optional[int] = None
+        self.fill_coalesce_sec = max(0.0, _env_float("EDGEX_GRID_FILL_COALESCE_MS", 200.0) / 1000.0)
+        # ストリーム稼働中でもこの間隔でRESTのOPEN注文と突合する（取りこぼし・外部キャンセル対策）
+        self.reconcile_sec = _env_float("EDGEX_GRID_RECONCILE_SEC", 60.0)
+        self._last_reconcile_ts: float = 0.0
+        # このループで取得したOPEN注文一覧（同期・発注前チェック・約定突合で共有し、1ループ1回の取得にする）
+        self._active_cache: Optional[list] = None
+        self._active_cache_iter: int = -1
+        # 追従BUY/SELLは並行に動くため、取得は1本に直列化する（後から終わった取得が、先に反映した自分の発注を上書きしない）
+        self._active_lock = asyncio.Lock()
+        # 上記一覧のサイド別・価格キー昇順の索引（発注前の距離チェックを二分探索で行う）
+        self._active_keys: Dict[OrderSide, SortedList] = {OrderSide.BUY: SortedList(), OrderSide.SELL: SortedList()}
+        # 同じ一覧の注文ID集合（約定突合は台帳のID集合との集合差だけで行う）
+        self._active_ids: Set[str] = set()
+
+    async def _tick(self) -> None:
+        """1ループ分の処理: 価格取得→(同期)→配置→約定確認."""
+        self._loop_iter += 1
+        log = self._log
+        log.opt(lazy=True).debug(
+            "グリッドループ開始: iter={} 配置済み買い={}本 配置済み売り={}本 初期化済み={}",
+            lambda: self._loop_iter,
+            lambda: len(self.placed_buy_px_to_id),
+            lambda: len(self.placed_sell_px_to_id),
+            lambda: self.initialized,
+        )
+
+        # 現在価格取得（ストリーム優先）
         try:
-            default_follow = "0" if self.simple_mode else "1"
-            self.follow_enable = str(os.getenv("EDGEX_GRID_FOLLOW_ENABLE", default_follow)).lower() in ("1", "true", "yes")
-        except Exception:
-            self.follow_enable = (not self.simple_mode)
-        try:
-            # X からの許容バンドを N ステップ分だけ広げる（例: 1 -> X+1*N までは許容）
-            self.follow_slack_steps = int(os.getenv("EDGEX_GRID_FOLLOW_SLACK_STEPS", "1"))
-        except Exception:
-            self.follow_slack_steps = 1
-        try:
-            # 1ループで寄せる最大本数（過度な再配置を抑制）
-            self.max_shift_per_loop = int(os.getenv("EDGEX_GRID_MAX_SHIFT_PER_LOOP", "1"))
-        except Exception:
-            self.max_shift_per_loop = 1
+            mid_price = await self._get_mid_price()
+        except Exception as e:
+            log.warning("中間価格の取得に失敗: {}", e)
+            return
+        self._tick_mid_key = self._px_key(mid_price)
 
-    def _has_min_gap(self, side_map: Dict[float, str], px: float) -> bool:
-        """Return True if `px` is at least `self.step` away from all existing prices in `side_map`."""
-        for existing_price in side_map.keys():
-            if abs(existing_price - px) < self.step - 1e-9:
-                return False
-        return True
+        # ソートはDEBUG出力時のみ実行
+        log.opt(lazy=True).debug(
+            "loop ctx: P={} X={} N={} levels={} placed_buy={} placed_sell={}",
+            lambda: mid_price,
+            lambda: self.first_offset,
+            lambda: self.step,
+            lambda: self.levels,
+            lambda: self.placed_buy_px_to_id.prices(),
+            lambda: self.placed_sell_px_to_id.prices(),
+        )
+
+        # BINモード: 周期的に取引所のOPEN注文と突合（3ループに1回など）
+        if self.bin_mode and self.active_sync_every > 0 and (self._loop_iter % self.active_sync_every == 0):
+            await self._sync_active_orders_from_exchange()
+
+        # グリッド配置
+        await self._ensure_grid(mid_price)
+
+        # 約定確認と補充
+        await self._replenish_if_filled()
+
+    def _anchor_targets(self, side: OrderSide, mid_price: float) -> List[float]:
+        """アンカー方式の目標価格 P∓(X + k*N)（近い順）。オフセット列は __init__ で計算済み."""
+        mid = float(mid_price)
+        if side is OrderSide.BUY:
+            return [mid - off for off in self._anchor_offsets]
+        return [mid + off for off in self._anchor_offsets]
+
+    def _set_price_tick(self, tick: float) -> None:
+        """価格キーの刻みを設定し、刻みに依存する整数ティック幅を作り直す."""
+        scale = _px_scale(tick)
+        # 刻みの整数倍でないstep（刻み未満を含む）は丸めると設定と違うグリッドになるため起動を拒否する
+        # （step<=0 は従来どおり配置しないだけ）
+        if self.step > 0 and (
+            _px_key(self.step, scale) < 1 or abs(self.step * scale - _px_key(self.step, scale)) > 1e-6
+        ):
+            raise ValueError(f"EDGEX_GRID_STEP_USD={self.step} は価格刻み {tick} の整数倍にしてください")
+        self._px_scale = scale
+        # BINモードは整数ティックで目標価格を計算する（float差分の誤差でキーがずれない）
+        self.step_ticks = self._px_key(self.step)
+        self._bin_offset_ticks = tuple(k * self.step_ticks for k in range(1, self.levels + 1))
+
+    def _px_key(self, px: float) -> int:
+        return _px_key(px, self._px_scale)
+
+    def _key_px(self, key: int) -> float:
+        return _key_px(key, self._px_scale)
+
+    def _on_ticker(self, ticker: Ticker) -> None:
+        """WebSocketのティッカー更新を受け取り、最新価格と受信時刻を上書きする."""
+        px = float(ticker.price)
+        self._stream_px = px
+        self._stream_px_ts = time.monotonic()
+        self._stream_px_key = self._px_key(px)
+        if self._price_moved():
+            self._wake_event.set()
+
+    def _price_moved(self) -> bool:
+        """ストリーム価格が前回ループで使った中値からN(step)以上動いたか（待たずに次ループへ進むべきか）。"""
+        if self._tick_mid_key is None or self._stream_px_key is None:
+            return False
+        # ストリームが古い間は中値がRESTから来るため、止まったストリーム値との差で毎ループ早起きしない
+        if time.monotonic() - self._stream_px_ts > self.stream_stale_sec:
+            return False
+        return abs(self._stream_px_key - self._tick_mid_key) >= self.step_ticks
+
+    async def _get_mid_price(self) -> float:
+        """現在価格: ストリームの最新値が新しければそれ、無ければ板ミッド→ティッカーの順で取得.
+
+        注意: ティッカーストリームが運ぶのは最終約定価格(lastPrice)であり、板のbid/askミッドではない。
+        ストリーム稼働中のグリッド基準価格は約定価格になり、古くなった時だけ板ミッドに戻る。
+        """
+        if self._streaming and self._stream_px is not None:
+            if time.monotonic() - self._stream_px_ts <= self.stream_stale_sec:
+                return self._stream_px
+            self._log.debug("ティッカーストリームの価格が古い: HTTPで取得します")
+        # まず板(bid/ask)からミッド算出（429回避・短期キャッシュ活用）。失敗時のみティッカーにフォールバック。
+        bid, ask = await self.adapter.get_best_bid_ask(self.symbol)
+        if bid is not None and ask is not None:
+            return (float(bid) + float(ask)) / 2.0
+        return await self.adapter.get_last_price(self.symbol)
 
     async def run(self) -> None:
         await self.adapter.connect()
+        try:
+            tick = await self.adapter.get_price_tick(self.symbol)
+        except Exception as e:
+            tick = None
+            self._log.warning("価格刻みの取得に失敗（設定値から決めた刻みで続行）: {}", e)
+        if tick:
+            self._set_price_tick(tick)
         self._running = True
-        logger.info(
+        if self.ws_enable:
+            self._streaming = await self.adapter.subscribe_ticker(self.symbol, self._on_ticker)
+            # 約定検知はアンカー方式のみ使用（BINは目標集合との差分で揃える）
+            if not self.bin_mode:
+                self._order_stream_task = asyncio.create_task(self._consume_order_updates())
+        if self.closed_poll_sec > 0 and self._fetch_closed is not None:
+            self._closed_pnl_task = asyncio.create_task(self._closed_pnl_periodic())
+        self._log.info(
             "グリッドエンジン起動: グリッド幅={}USD レベル数={} サイズ={}BTC",
             self.step,
             self.levels,
             self.size,
         )
-        logger.debug(
+        self._log.debug(
             "grid boot env: step(N)={} offset(X)={} levels={} max_new_per_loop={} enforce_levels={} size={}",
             self.step,
             self.first_offset,
             self.levels,
             self.max_new_per_loop,
-            getattr(self, "enforce_levels", True),
+            self.enforce_levels,
             self.size,
         )
         try:
+            # 周期は単調時計の締切で管理（処理時間のばらつきで周期がずれないように）
+            next_tick_at = time.monotonic()
             while self._running:
+                next_tick_at += self.poll_interval_sec
                 try:
-                    self._loop_iter += 1
-                    logger.debug("グリッドループ開始: iter={} 配置済み買い={}本 配置済み売り={}本 初期化済み={}", 
-                                self._loop_iter, len(self.placed_buy_px_to_id), len(self.placed_sell_px_to_id), self.initialized)
-
-                    # 現在価格取得: まず板(bid/ask)からミッド算出（429回避・短期キャッシュ活用）。失敗時のみティッカーにフォールバック。
-                    try:
-                        bid, ask = await self.adapter.get_best_bid_ask(self.symbol)
-                        if bid is not None and ask is not None:
-                            mid_price = (float(bid) + float(ask)) / 2.0
-                        else:
-                            ticker = await self.adapter.get_ticker(self.symbol)
-                            mid_price = ticker.price  # type: ignore[attr-defined]
-                    except Exception as e:
-                        logger.warning("中間価格の取得に失敗: {}", e)
-                        await asyncio.sleep(self.poll_interval_sec)
-                        continue
+                    await self._tick()
+                except Exception as e:
+                    self._log.warning("グリッドループエラー: {}", e)
 
-                    logger.debug(
-                        "loop ctx: P={} X={} N={} levels={} placed_buy={} placed_sell={}",
-                        mid_price,
-                        self.first_offset,
-                        self.step,
-                        self.levels,
-                        sorted(self.placed_buy_px_to_id.keys()),
-                        sorted(self.placed_sell_px_to_id.keys()),
-                    )
+                # 正常時もエラー時も待機は1回だけ（API連打抑制・429対策）。±20%のジッタで他Botとの同期を避ける
+                now = time.monotonic()
+                if next_tick_at < now:
+                    # 処理が周期を超えた場合は遅れを持ち越さない
+                    next_tick_at = now
+                delay = max(self.op_spacing_sec, next_tick_at - now + self.poll_interval_sec * random.uniform(-0.2, 0.2))
+                self._log.debug("グリッドループ終了: iter={} 待機時間={:.2f}秒", self._loop_iter, delay)
+                if await self._wait_next_tick(delay):
+                    # 約定・値動きで早起きした場合は、その時点から次の周期を数える
+                    next_tick_at = time.monotonic()
 
-                    # BINモード: 周期的に取引所のOPEN注文と突合（3ループに1回など）
-                    if self.bin_mode and getattr(self, "active_sync_every", 0) > 0 and (self._loop_iter % self.active_sync_every == 0):
-                        await self._sync_active_orders_from_exchange()
+        finally:
+            for task in (self._order_stream_task, self._closed_pnl_task):
+                if task is not None:
+                    task.cancel()
+            await self.adapter.close()
+            self._log.info("グリッドエンジン停止")
 
-                    # グリッド配置
-                    await self._ensure_grid(mid_price)
+    async def _wait_next_tick(self, delay: float) -> bool:
+        """次ループまで待つ。約定通知かN以上の値動き（ストリーム）が来たら早めに起きてTrueを返す.
 
-                    # 約定確認と補充
-                    await self._replenish_if_filled()
+        早起きしても op_spacing_sec の最小間隔は守る。約定で起きた場合は fill_coalesce_sec も待ち、
+        同じ値動きで続けて約定した分を1回の補充にまとめる。
+        """
+        started = time.monotonic()
+        if self._fill_queue.empty() and not self._price_moved():
+            self._wake_event.clear()
+            try:
+                await asyncio.wait_for(self._wake_event.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                return False
+        hold = self.fill_coalesce_sec if not self._fill_queue.empty() else 0.0
+        hold = min(delay, max(hold, self.op_spacing_sec - (time.monotonic() - started)))
+        if hold > 0:
+            await asyncio.sleep(hold)
+        return True
 
-                except Exception as e:
-                    logger.warning("グリッドループエラー: {}", e)
-                    logger.debug("グリッドループ終了: iter={} 待機時間={}秒", self._loop_iter, self.poll_interval_sec)
-                    await asyncio.sleep(self.poll_interval_sec)
+    async def _consume_order_updates(self) -> None:
+        """注文WebSocketの更新を受け取り、約定(FILLED)した注文IDを _fill_queue へ積み、取消は台帳から外す."""
+        try:
+            async for row in self.adapter.subscribe_order_updates(self.symbol):
+                # 何か1件でも届けばストリームは稼働中とみなす（自分の発注でも更新が来る）
+                self._order_stream_alive = True
+                status = str(row.get("status") or "").upper()
+                oid = row.get("id") or row.get("orderId")
+                if not oid:
+                    continue
+                if status == "FILLED":
+                    self._fill_queue.put_nowait(str(oid))
+                    self._wake_event.set()
+                elif status in ("CANCELED", "CANCELLED", "EXPIRED"):
+                    # 取引所側/手動で取り消された注文は台帳から外すだけ（約定ではないので補充しない）
+                    self._last_ensure_key = None
+                    # 注文ID→キーの逆引きで該当サイドだけを直接外す（台帳の走査はしない）
+                    removed = self.placed_buy_px_to_id.pop_order(str(oid)) or self.placed_sell_px_to_id.pop_order(str(oid))
+                    if removed is not None:
+                        self._log.info("注文取消を検知: 価格=${:.1f} ID={}", removed[0], oid)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._log.warning("注文ストリーム停止（REST突合に戻します）: {}", e)
+        finally:
+            self._order_stream_alive = False
 
-                # 定期: クローズ損益の新規行を取り込み
-                await self._poll_closed_pnl_once()
+    def _retry_delay(self, attempt: int) -> float:
+        return backoff_delay(attempt, self.retry_base_sec, self.retry_cap_sec)
 
-                # 正常時も必ず待機してAPI連打を抑制（429対策）
-                logger.debug("グリッドループ終了: iter={} 待機時間={}秒", self._loop_iter, self.poll_interval_sec)
-                await asyncio.sleep(self.poll_interval_sec)
+    async def _with_retry(self, fn, *args):
+        """``fn(*args)`` を呼び、レート制限エラーなら指数バックオフで再試行する（上限回数で元の例外を送出）。"""
+        for attempt in range(self.retry_attempts):
+            try:
+                return await fn(*args)
+            except Exception as e:
+                if attempt + 1 >= self.retry_attempts or not _is_rate_limited(e):
+                    raise
+                delay = self._retry_delay(attempt)
+                self._log.debug("レート制限のため再試行: {:.2f}秒後 ({}/{})", delay, attempt + 1, self.retry_attempts - 1)
+                await asyncio.sleep(delay)
 
-        finally:
-            await self.adapter.close()
-            logger.info("グリッドエンジン停止")
+    async def _batch_with_retry(self, batch_fn, items: list) -> list:
+        """バッチ発注/取消を送り、レート制限で失敗した要素だけを指数バックオフで再送する（結果はitemsと同順）."""
+        results = list(await batch_fn(items, concurrency=self.max_concurrent_orders))
+        for attempt in range(self.retry_attempts - 1):
+            pending = [i for i, r in enumerate(results) if isinstance(r, BaseException) and _is_rate_limited(r)]
+            if not pending:
+                break
+            delay = self._retry_delay(attempt)
+            self._log.debug("レート制限のため{}件を再送: {:.2f}秒後", len(pending), delay)
+            await asyncio.sleep(delay)
+            again = await batch_fn([items[i] for i in pending], concurrency=self.max_concurrent_orders)
+            for i, r in zip(pending, again):
+                results[i] = r
+        return results
+
+    async def _active_orders_snapshot(self, fresh: bool = False) -> list:
+        """このループで取得済みのOPEN注文一覧を返す（未取得または fresh 指定時は取得し直す）.
+
+        自分の発注・取消は取得し直さずに一覧へ反映する（_remember_placed / _cancel_orders）。
+        """
+        if not (fresh or self._active_cache is None or self._active_cache_iter != self._loop_iter):
+            return self._active_cache
+        async with self._active_lock:
+            # ロック待ちの間に他のタスクがこのループ分を取得済みなら、それを使う
+            if fresh or self._active_cache is None or self._active_cache_iter != self._loop_iter:
+                await self._fetch_active_orders()
+        return self._active_cache
+
+    async def _fetch_active_orders(self) -> None:
+        """OPEN注文一覧を取得し、サイド別の価格キー索引とID集合を作り直す."""
+        self._active_cache = list(await self._with_retry(self.adapter.list_active_orders, self.symbol) or [])
+        self._active_cache_iter = self._loop_iter
+        buys: List[int] = []
+        sells: List[int] = []
+        ids: Set[str] = set()
+        for row in self._active_cache:
+            sk = _row_side_key(row, self._px_scale)
+            if sk is not None:
+                (buys if sk[0] is OrderSide.BUY else sells).append(sk[1])
+            oid = _row_order_id(row)
+            if oid:
+                ids.add(oid)
+        self._active_keys = {OrderSide.BUY: SortedList(buys), OrderSide.SELL: SortedList(sells)}
+        self._active_ids = ids
+
+    def _remember_placed(self, side: OrderSide, price: float, order_id: str) -> None:
+        """発注成功をこのループのOPEN注文一覧に追記する（次の取得まで古い一覧で約定と誤判定しない）。"""
+        if self._active_cache is not None and self._active_cache_iter == self._loop_iter:
+            self._active_cache.append({"orderId": order_id, "price": str(price), "side": side.value, "status": "OPEN"})
+            self._active_keys[side].add(self._px_key(price))
+            self._active_ids.add(order_id)
 
     async def _sync_active_orders_from_exchange(self) -> None:
         """取引所のOPEN注文を取得し、内部マップを実態に同期する（BIN用の軽量突合）。"""
         try:
-            active_orders = await self.adapter.list_active_orders(self.symbol)
+            active_orders = await self._active_orders_snapshot()
         except Exception as e:
-            logger.debug("active sync skip: {}", e)
+            self._log.debug("active sync skip: {}", e)
             return
 
-        new_buys: Dict[float, str] = {}
-        new_sells: Dict[float, str] = {}
-
-        def _px(row: dict) -> float | None:
-            try:
-                raw = row.get("price") or row.get("px") or row.get("0")
-                return float(raw) if raw is not None else None
-            except Exception:
-                return None
-
-        def _oid(row: dict) -> str | None:
-            oid = (
-                row.get("orderId")
-                or row.get("id")
-                or row.get("order_id")
-                or row.get("clientOrderId")
-                or row.get("client_order_id")
-            )
-            return str(oid) if oid else None
+        new_buys = _PriceBook()
+        new_sells = _PriceBook()
 
         for row in (active_orders or []):
-            if not isinstance(row, dict):
-                continue
-            # 状態/シンボル/サイド/価格
-            status = str(row.get("status") or "").upper()
+            # 状態/サイド/価格/IDが揃ったOPEN注文だけを台帳に入れる
+            status = str(row.get("status") or "").upper() if isinstance(row, dict) else ""
             if status and status != "OPEN":
                 continue
-            # 価格
-            px = _px(row)
-            if px is None:
+            sk = _row_side_key(row, self._px_scale)
+            oid = _row_order_id(row)
+            if sk is None or not oid:
                 continue
-            # サイド
-            side_str = str(row.get("side") or row.get("orderSide") or "").upper()
-            oid = _oid(row)
-            if not oid or not side_str:
-                continue
-            if side_str in ("BUY", "LONG"):
-                new_buys[px] = oid
-            elif side_str in ("SELL", "SHORT"):
-                new_sells[px] = oid
+            side, key = sk
+            (new_buys if side is OrderSide.BUY else new_sells)[key] = (self._key_px(key), oid)
 
         self.placed_buy_px_to_id = new_buys
         self.placed_sell_px_to_id = new_sells
-        logger.debug("active sync: buy={} sell={}", len(new_buys), len(new_sells))
+        self._last_ensure_key = None
+        self._log.debug("active sync: buy={} sell={}", len(new_buys), len(new_sells))
 
     async def _ensure_grid(self, mid_price: float):
         """
@@ -261,414 +658,427 @@ class GridEngine:
         """
         if self.step <= 0:
             return
-
-        # === BIN固定モード: 常に絶対N刻みの価格帯に合わせる（追従/約定イベントに依存しない） ===
         if self.bin_mode:
-            # 中心を「stepの整数倍」に丸める（例: step=100, P=100,050 → center=100,100）
-            try:
-                center_units = round(float(mid_price) / self.step)
-                center = float(center_units * self.step)
-            except Exception:
-                center = float(mid_price)
-
-            # 0段（centerそのもの）は置かない。各サイド1..levels段を配置
-            # 例: step=100, levels=5, center=100,000 →
-            #   BUY: 99,500..99,900 / SELL: 100,100..100,500
-            buy_targets = [center - k * self.step for k in range(self.levels, 0, -1)]
-            sell_targets = [center + k * self.step for k in range(1, self.levels + 1)]
-
-            target_buy_set = set(buy_targets)
-            target_sell_set = set(sell_targets)
-
-            # 取消対象: 目標集合から外れている自ボットの注文
-            cancel_ids: list[tuple[str, float]] = []
-            for px, oid in list(self.placed_buy_px_to_id.items()):
-                if px not in target_buy_set:
-                    cancel_ids.append((oid, px))
-            for px, oid in list(self.placed_sell_px_to_id.items()):
-                if px not in target_sell_set:
-                    cancel_ids.append((oid, px))
-            # キャンセル（過度な連発を避けるため最大levels本）
-            for oid, px in cancel_ids[: max(1, self.levels)]:
-                try:
-                    await self.adapter.cancel_order(oid)
-                    if px in self.placed_buy_px_to_id and self.placed_buy_px_to_id.get(px) == oid:
-                        del self.placed_buy_px_to_id[px]
-                    if px in self.placed_sell_px_to_id and self.placed_sell_px_to_id.get(px) == oid:
-                        del self.placed_sell_px_to_id[px]
-                    logger.info("BIN: 目標外をキャンセル id={} px={}", oid, px)
-                except Exception:
-                    logger.debug("BIN: キャンセル失敗(無視) id={} px={}", oid, px)
-                await asyncio.sleep(self.op_spacing_sec)
-
-            # 発注対象: 目標集合−現状
-            need_buys = [px for px in buy_targets if px not in self.placed_buy_px_to_id]
-            need_sells = [px for px in sell_targets if px not in self.placed_sell_px_to_id]
-
-            # 片側あたりの新規上限
-            add_buys = 0
-            add_sells = 0
+            await self._ensure_bin_grid(mid_price)
+        else:
+            await self._place_initial_grid(mid_price)
 
-            for px in need_buys:
-                if self.max_new_per_loop and add_buys >= self.max_new_per_loop:
-                    break
-                await self._place_order(OrderSide.BUY, px)
-                add_buys += 1
-                await asyncio.sleep(self.op_spacing_sec)
-            
-            for px in need_sells:
-                if self.max_new_per_loop and add_sells >= self.max_new_per_loop:
-                    break
-                await self._place_order(OrderSide.SELL, px)
-                add_sells += 1
-                await asyncio.sleep(self.op_spacing_sec)
-            
-            if not self.initialized:
-                self.initialized = True
-                logger.info("BIN: 初期配置完了 買い{}本 売り{}本", len(self.placed_buy_px_to_id), len(self.placed_sell_px_to_id))
+    async def _ensure_bin_grid(self, mid_price: float):
+        """BIN固定モード: 常に絶対N刻みの価格帯に合わせる（追従/約定イベントに依存しない）."""
+        # 中心を「stepの整数倍」に丸める（例: step=100, P=100,050 → center=100,100）
+        try:
+            center_key = round(float(mid_price) * self._step_inv) * self.step_ticks
+        except Exception:
+            center_key = self._px_key(float(mid_price))
+        # 前回から中心も台帳も変わっていなければ差分計算そのものを省く（静かな相場ではここで戻る）
+        if self._last_ensure_key == (center_key, len(self.placed_buy_px_to_id), len(self.placed_sell_px_to_id)):
             return
 
+        # 0段（centerそのもの）は置かない。各サイド1..levels段を配置
+        # 例: step=100, levels=5, center=100,000 →
+        #   BUY: 99,500..99,900 / SELL: 100,100..100,500
+        buy_keys = [center_key - off for off in reversed(self._bin_offset_ticks)]
+        sell_keys = [center_key + off for off in self._bin_offset_ticks]
+
+        target_buy_set = set(buy_keys)
+        target_sell_set = set(sell_keys)
+
+        # 取消対象: 目標集合から外れている自ボットの注文
+        cancel_ids: list[tuple[str, float, int]] = []
+        for k, (px, oid) in self.placed_buy_px_to_id.items():
+            if k not in target_buy_set:
+                cancel_ids.append((oid, px, k))
+        for k, (px, oid) in self.placed_sell_px_to_id.items():
+            if k not in target_sell_set:
+                cancel_ids.append((oid, px, k))
+        # キャンセル（過度な連発を避けるため最大levels本）。1バッチで送り、成功した分だけ台帳から外す
+        cancel_batch = cancel_ids[: max(1, self.levels)]
+        cancelled = await self._cancel_orders([oid for oid, _, _ in cancel_batch], label="BIN: 目標外")
+        for (oid, px, k), done in zip(cancel_batch, cancelled):
+            if not done:
+                continue
+            if self.placed_buy_px_to_id.get(k, (None, None))[1] == oid:
+                del self.placed_buy_px_to_id[k]
+            if self.placed_sell_px_to_id.get(k, (None, None))[1] == oid:
+                del self.placed_sell_px_to_id[k]
+
+        # 発注対象: 目標集合−現状
+        need_buys = [self._key_px(k) for k in buy_keys if k not in self.placed_buy_px_to_id]
+        need_sells = [self._key_px(k) for k in sell_keys if k not in self.placed_sell_px_to_id]
+
+        # 片側あたりの新規上限
+        if self.max_new_per_loop:
+            need_buys = need_buys[: self.max_new_per_loop]
+            need_sells = need_sells[: self.max_new_per_loop]
+
+        # 両サイドまとめて1バッチで発注
+        legs = [(OrderSide.BUY, px) for px in need_buys] + [(OrderSide.SELL, px) for px in need_sells]
+        if legs:
+            await self._place_orders(legs)
+
+        # 台帳が目標集合と一致したときだけ記録する（発注・取消が残っていれば次回も差分を取る）
+        if self.placed_buy_px_to_id.keys() == target_buy_set and self.placed_sell_px_to_id.keys() == target_sell_set:
+            self._last_ensure_key = (center_key, len(self.placed_buy_px_to_id), len(self.placed_sell_px_to_id))
+        else:
+            self._last_ensure_key = None
+
+        if not self.initialized:
+            self.initialized = True
+            self._log.info("BIN: 初期配置完了 買い{}本 売り{}本", len(self.placed_buy_px_to_id), len(self.placed_sell_px_to_id))
+
+    def _seed_legs(self, side: OrderSide, mid_price: float, targets: List[float], limit: int = 0) -> List[Tuple[OrderSide, float]]:
+        """アンカー目標のうち置ける価格だけを近い順にレッグにする（初回配置と片側再シードで共用）.
+
+        P∓X より内側（P±X の設計上は生成しないが念のため）・配置済み・既存とN未満の価格は飛ばす。
+        ``limit`` > 0 なら片側の新規本数をその数までにする。
+        """
+        # 現在価格との比較は整数キーで行う（±1e-9 の許容誤差に頼らない）
+        mid_key = self._px_key(mid_price)
+        book = self.placed_buy_px_to_id if side is OrderSide.BUY else self.placed_sell_px_to_id
+        legs: List[Tuple[OrderSide, float]] = []
+        for px in targets:
+            key = self._px_key(px)
+            if px <= 0 or (key >= mid_key if side is OrderSide.BUY else key <= mid_key):
+                self._log.debug("skip(seed {}): inside X px={} P={}", side.value, px, mid_price)
+                continue
+            if key in book:
+                self._log.debug("skip(seed {}): already placed px={}", side.value, px)
+                continue
+            if not _has_min_gap(self.step_ticks, book, self._px_key(px)):
+                self._log.debug("skip(seed {}): gap < N at px={}", side.value, px)
+                continue
+            if limit and len(legs) >= limit:
+                break
+            legs.append((side, px))
+        return legs
+
+    async def _place_initial_grid(self, mid_price: float):
+        """初回配置。完了後は ``_ensure_grid`` を ``_place_steady_grid`` に差し替える."""
+        # 候補を作る
+        buy_targets = self._anchor_targets(OrderSide.BUY, mid_price)
+        sell_targets = self._anchor_targets(OrderSide.SELL, mid_price)
+        self._log.opt(lazy=True).debug(
+            "ensure(init): P={} X={} N={} buy_targets={} sell_targets={}",
+            lambda: mid_price, lambda: self.first_offset, lambda: self.step, lambda: buy_targets, lambda: sell_targets,
+        )
+
+        # 以降はターゲットに合わせて一斉キャンセルは行わない（アンカー方式）
+        # 片側あたり新規上限が設定されていれば適用し、両サイドまとめて1バッチで発注
+        legs = (
+            self._seed_legs(OrderSide.BUY, mid_price, buy_targets, self.max_new_per_loop)
+            + self._seed_legs(OrderSide.SELL, mid_price, sell_targets, self.max_new_per_loop)
+        )
+        if legs:
+            await self._place_orders(legs)
+
+        self.initialized = True
+        self._log.info("初回グリッド配置完了: 買い{}本 売り{}本", 
+                   len(self.placed_buy_px_to_id), len(self.placed_sell_px_to_id))
+        # 以降のループは定常処理だけを呼ぶ（初期化済みかの分岐を毎回通らない）
+        self._ensure_grid = self._place_steady_grid  # type: ignore[method-assign]
+
+    async def _place_steady_grid(self, mid_price: float):
+        """初期配置後の定常処理（再シード/追従シフト/levels補充）."""
+        mid_key = self._px_key(mid_price)
         # 初期配置後:
         # - 片側が全滅していたら、その片側だけ現在価格Pから再配置（挟み込みを回復）
         # - 両側に1本以上あれば、ここでは新規発注しない（補充は約定側で行う）
-        if self.initialized:
-            need_buy_seed = len(self.placed_buy_px_to_id) == 0
-            need_sell_seed = len(self.placed_sell_px_to_id) == 0
-            # 片側が空なら再シード（初期の挟み込みを回復）
-            if need_buy_seed or need_sell_seed:
-                buy_targets = [float(mid_price) - (self.first_offset + i * self.step) for i in range(self.levels)]
-                sell_targets = [float(mid_price) + (self.first_offset + i * self.step) for i in range(self.levels)]
-                logger.info("再配置: need_buy={} need_sell={} P={} X={} N={}", need_buy_seed, need_sell_seed, mid_price, self.first_offset, self.step)
-                # BUY再種まき
-                if need_buy_seed:
-                    new_buys = 0
-                    for px in buy_targets:
-                        if px <= 0:
-                            continue
-                        if px >= (mid_price - 1e-9):
-                            continue
-                        if px in self.placed_buy_px_to_id:
-                            continue
-                        if not self._has_min_gap(self.placed_buy_px_to_id, px):
-                            continue
-                        await self._place_order(OrderSide.BUY, px)
-                        new_buys += 1
-                        await asyncio.sleep(self.op_spacing_sec)
-                        if new_buys >= self.levels:
-                            break
-                # SELL再種まき
-                if need_sell_seed:
-                    new_sells = 0
-                    for px in sell_targets:
-                        if px <= (mid_price + 1e-9):
-                            continue
-                        if px in self.placed_sell_px_to_id:
-                            continue
-                        if not self._has_min_gap(self.placed_sell_px_to_id, px):
-                            continue
-                        await self._place_order(OrderSide.SELL, px)
-                        new_sells += 1
-                        await asyncio.sleep(self.op_spacing_sec)
-                        if new_sells >= self.levels:
-                            break
-                return
-
-            # 両サイドに1本以上ある場合: 追従（価格乖離の自動シフト）
-            # 任意: 価格追従（シンプルモードでは既定OFF）
-            if self.follow_enable and self.step > 0:
+        need_buy_seed = len(self.placed_buy_px_to_id) == 0
+        need_sell_seed = len(self.placed_sell_px_to_id) == 0
+        # 片側が空なら再シード（初期の挟み込みを回復）
+        if need_buy_seed or need_sell_seed:
+            self._log.info("再配置: need_buy={} need_sell={} P={} X={} N={}", need_buy_seed, need_sell_seed, mid_price, self.first_offset, self.step)
+            legs: List[Tuple[OrderSide, float]] = []
+            for side, need in ((OrderSide.BUY, need_buy_seed), (OrderSide.SELL, need_sell_seed)):
+                if need:
+                    legs += self._seed_legs(side, mid_price, self._anchor_targets(side, mid_price))
+            if legs:
+                await self._place_orders(legs)
+            return
 
-                # BUY側: 近い買いが P-(X+slack*N) より遠くにあるなら、遠い買いを1本消して内側へ1ステップ寄せる
-                try:
-                    shifts = 0
-                    if self.placed_buy_px_to_id:
-                        nearest_buy = max(self.placed_buy_px_to_id.keys())  # 市場に最も近い買い
-                        desired_min_buy = float(mid_price) - (self.first_offset + self.follow_slack_steps * self.step)
-                        while nearest_buy < desired_min_buy - 1e-9 and shifts < self.max_shift_per_loop:
-                            if len(self.placed_buy_px_to_id) <= 0:
-                                break
-                            far_buy_px = min(self.placed_buy_px_to_id.keys())
-                            far_buy_id = self.placed_buy_px_to_id.pop(far_buy_px)
-                            try:
-                                await self.adapter.cancel_order(far_buy_id)
-                                logger.info("追従: 遠いBUYキャンセル px={}", far_buy_px)
-                            except Exception:
-                                logger.debug("追従: 遠いBUYキャンセル失敗(無視) id={} px={}", far_buy_id, far_buy_px)
-                            await asyncio.sleep(self.op_spacing_sec)
-
-                            new_buy_px = nearest_buy + self.step
-                            # 安全: 現在価格の内側には置かない
-                            if new_buy_px >= (mid_price - 1e-9):
-                                break
-                            if new_buy_px in self.placed_buy_px_to_id:
-                                nearest_buy = new_buy_px
-                                shifts += 1
-                                continue
-                            if not self._has_min_gap(self.placed_buy_px_to_id, new_buy_px):
-                                logger.debug("追従: BUY gap違反でスキップ new_px={}", new_buy_px)
-                                break
-                            await self._place_order(OrderSide.BUY, new_buy_px)
-                            nearest_buy = new_buy_px
-                            shifts += 1
-                            await asyncio.sleep(self.op_spacing_sec)
-                        if shifts:
-                            logger.debug("追従BUY: nearest={} desired_min={} shifts={}", nearest_buy, desired_min_buy, shifts)
-                except Exception as e:
-                    logger.debug("追従BUY処理スキップ: {}", e)
+        # 両サイドに1本以上ある場合: 追従（価格乖離の自動シフト）
+        # 任意: 価格追従（シンプルモードでは既定OFF）
+        if self.follow_enable and self.step > 0:
 
-                # SELL側: 近い売りが P+(X+slack*N) より遠くにあるなら、遠い売りを1本消して内側へ1ステップ寄せる
-                try:
-                    shifts = 0
-                    if self.placed_sell_px_to_id:
-                        nearest_sell = min(self.placed_sell_px_to_id.keys())  # 市場に最も近い売り
-                        desired_max_sell = float(mid_price) + (self.first_offset + self.follow_slack_steps * self.step)
-                        while nearest_sell > desired_max_sell + 1e-9 and shifts < self.max_shift_per_loop:
-                            if len(self.placed_sell_px_to_id) <= 0:
-                                break
-                            far_sell_px = max(self.placed_sell_px_to_id.keys())
-                            far_sell_id = self.placed_sell_px_to_id.pop(far_sell_px)
-                            try:
-                                await self.adapter.cancel_order(far_sell_id)
-                                logger.info("追従: 遠いSELLキャンセル px={}", far_sell_px)
-                            except Exception:
-                                logger.debug("追従: 遠いSELLキャンセル失敗(無視) id={} px={}", far_sell_id, far_sell_px)
-                            await asyncio.sleep(self.op_spacing_sec)
-
-                            new_sell_px = nearest_sell - self.step
-                            # 安全: 現在価格の内側には置かない
-                            if new_sell_px <= (mid_price + 1e-9):
-                                break
-                            if new_sell_px in self.placed_sell_px_to_id:
-                                nearest_sell = new_sell_px
-                                shifts += 1
-                                continue
-                            if not self._has_min_gap(self.placed_sell_px_to_id, new_sell_px):
-                                logger.debug("追従: SELL gap違反でスキップ new_px={}", new_sell_px)
-                                break
-                            await self._place_order(OrderSide.SELL, new_sell_px)
-                            nearest_sell = new_sell_px
-                            shifts += 1
-                            await asyncio.sleep(self.op_spacing_sec)
-                        if shifts:
-                            logger.debug("追従SELL: nearest={} desired_max={} shifts={}", nearest_sell, desired_max_sell, shifts)
-                except Exception as e:
-                    logger.debug("追従SELL処理スキップ: {}", e)
-            # フォローの有無に関係なく、本数不足があれば外側に補充（levels維持）
-            try:
-                # 片側あたりの新規上限を考慮
-                add_buys = 0
-                add_sells = 0
-                # BUY不足: 最外側(min)から外側へ足す（失敗時はさらに一段外へ最大3回リトライ）
-                while len(self.placed_buy_px_to_id) < self.levels:
-                    if not self.placed_buy_px_to_id:
-                        break
-                    cand = min(self.placed_buy_px_to_id.keys()) - self.step
-                    attempts = 0
-                    placed = False
-                    while cand <= (mid_price - 1e-9) and self._has_min_gap(self.placed_buy_px_to_id, cand) and attempts < 3:
-                        if self.max_new_per_loop and add_buys >= self.max_new_per_loop:
+            # 買い/売りの追従は互いの台帳に書き込まないため並行に実行する
+            await asyncio.gather(self._follow_buy(mid_price), self._follow_sell(mid_price))
+        # フォローの有無に関係なく、本数不足があれば外側に補充（levels維持）
+        try:
+            # 片側あたりの新規上限を考慮
+            add_buys = 0
+            add_sells = 0
+            # 不足分を最外側から外側へまとめて足す。弾かれたサイドだけ次の試行で一段外へずらして再バッチ（最大3回）
+            buy_shift = 0
+            sell_shift = 0
+            for _ in range(3):
+                legs: List[Tuple[OrderSide, float]] = []
+                # BUY不足: 最外側(min)から外側へ
+                n_buy = self.levels - len(self.placed_buy_px_to_id)
+                if self.max_new_per_loop:
+                    n_buy = min(n_buy, self.max_new_per_loop - add_buys)
+                if self.placed_buy_px_to_id and n_buy > 0:
+                    outer = self.placed_buy_px_to_id.min_px()
+                    for k in range(1, n_buy + 1):
+                        cand = outer - (k + buy_shift) * self.step
+                        if self._px_key(cand) >= mid_key or not _has_min_gap(self.step_ticks, self.placed_buy_px_to_id, self._px_key(cand)):
                             break
-                        before = set(self.placed_buy_px_to_id.keys())
-                        await self._place_order(OrderSide.BUY, cand)
-                        await asyncio.sleep(self.op_spacing_sec)
-                        after = set(self.placed_buy_px_to_id.keys())
-                        if cand in after and cand not in before:
-                            placed = True
-                            add_buys += 1
+                        legs.append((OrderSide.BUY, cand))
+                # SELL不足: 最外側(max)から外側へ
+                n_sell = self.levels - len(self.placed_sell_px_to_id)
+                if self.max_new_per_loop:
+                    n_sell = min(n_sell, self.max_new_per_loop - add_sells)
+                if self.placed_sell_px_to_id and n_sell > 0:
+                    outer = self.placed_sell_px_to_id.max_px()
+                    for k in range(1, n_sell + 1):
+                        cand = outer + (k + sell_shift) * self.step
+                        if self._px_key(cand) <= mid_key or not _has_min_gap(self.step_ticks, self.placed_sell_px_to_id, self._px_key(cand)):
                             break
-                        # 価格が食い込み等で弾かれた場合はさらに外側へ
-                        cand -= self.step
-                        attempts += 1
-                    if not placed:
+                        legs.append((OrderSide.SELL, cand))
+                if not legs:
+                    break
+                ok = await self._place_orders(legs)
+                buy_failed = sell_failed = False
+                for (side, _px), placed in zip(legs, ok):
+                    if side is OrderSide.BUY:
+                        add_buys += placed
+                        buy_failed = buy_failed or not placed
+                    else:
+                        add_sells += placed
+                        sell_failed = sell_failed or not placed
+                if not (buy_failed or sell_failed):
+                    break
+                # 価格が食い込み等で弾かれたサイドはさらに外側へ
+                buy_shift += buy_failed
+                sell_shift += sell_failed
+            if add_buys or add_sells:
+                self._log.debug("levels補充: add_buys={} add_sells={} now buy={} sell={}", add_buys, add_sells, len(self.placed_buy_px_to_id), len(self.placed_sell_px_to_id))
+        except Exception as e:
+            self._log.debug("levels補充スキップ: {}", e)
+
+    async def _follow_buy(self, mid_price: float) -> None:
+        """追従シフト（BUY側）."""
+        mid_key = self._px_key(mid_price)
+        # BUY側: 近い買いが P-(X+slack*N) より遠くにあるなら、遠い買いを1本消して内側へ1ステップ寄せる
+        try:
+            shifts = 0
+            cancel_ids: List[str] = []
+            legs: List[Tuple[OrderSide, float]] = []
+            if self.placed_buy_px_to_id:
+                nearest_buy = self.placed_buy_px_to_id.max_px()  # 市場に最も近い買い
+                desired_min_buy = float(mid_price) - (self.first_offset + self.follow_slack_steps * self.step)
+                desired_min_key = self._px_key(desired_min_buy)
+                while self._px_key(nearest_buy) < desired_min_key and shifts < self.max_shift_per_loop:
+                    if len(self.placed_buy_px_to_id) <= 0:
+                        break
+                    cancel_ids.append(self.placed_buy_px_to_id.popitem(0)[1][1])
+
+                    new_buy_px = nearest_buy + self.step
+                    # 安全: 現在価格の内側には置かない
+                    if self._px_key(new_buy_px) >= mid_key:
                         break
-                # SELL不足: 最外側(max)から外側へ足す（失敗時はさらに一段外へ最大3回リトライ）
-                while len(self.placed_sell_px_to_id) < self.levels:
-                    if not self.placed_sell_px_to_id:
+                    if self._px_key(new_buy_px) in self.placed_buy_px_to_id:
+                        nearest_buy = new_buy_px
+                        shifts += 1
+                        continue
+                    if not _has_min_gap(self.step_ticks, self.placed_buy_px_to_id, self._px_key(new_buy_px)):
+                        self._log.debug("追従: BUY gap違反でスキップ new_px={}", new_buy_px)
                         break
-                    cand = max(self.placed_sell_px_to_id.keys()) + self.step
-                    attempts = 0
-                    placed = False
-                    while cand >= (mid_price + 1e-9) and self._has_min_gap(self.placed_sell_px_to_id, cand) and attempts < 3:
-                        if self.max_new_per_loop and add_sells >= self.max_new_per_loop:
-                            break
-                        before = set(self.placed_sell_px_to_id.keys())
-                        await self._place_order(OrderSide.SELL, cand)
-                        await asyncio.sleep(self.op_spacing_sec)
-                        after = set(self.placed_sell_px_to_id.keys())
-                        if cand in after and cand not in before:
-                            placed = True
-                            add_sells += 1
-                            break
-                        # 価格が食い込み等で弾かれた場合はさらに外側へ
-                        cand += self.step
-                        attempts += 1
-                    if not placed:
+                    legs.append((OrderSide.BUY, new_buy_px))
+                    nearest_buy = new_buy_px
+                    shifts += 1
+                # シフト分の取消・発注はそれぞれ1回のバッチで送る（1本ずつ直列に待たない）
+                await self._cancel_orders(cancel_ids, "追従: 遠いBUY")
+                await self._place_orders(legs)
+                if shifts:
+                    self._log.debug("追従BUY: nearest={} desired_min={} shifts={}", nearest_buy, desired_min_buy, shifts)
+        except Exception as e:
+            self._log.debug("追従BUY処理スキップ: {}", e)
+
+    async def _follow_sell(self, mid_price: float) -> None:
+        """追従シフト（SELL側）."""
+        mid_key = self._px_key(mid_price)
+        # SELL側: 近い売りが P+(X+slack*N) より遠くにあるなら、遠い売りを1本消して内側へ1ステップ寄せる
+        try:
+            shifts = 0
+            cancel_ids: List[str] = []
+            legs: List[Tuple[OrderSide, float]] = []
+            if self.placed_sell_px_to_id:
+                nearest_sell = self.placed_sell_px_to_id.min_px()  # 市場に最も近い売り
+                desired_max_sell = float(mid_price) + (self.first_offset + self.follow_slack_steps * self.step)
+                desired_max_key = self._px_key(desired_max_sell)
+                while self._px_key(nearest_sell) > desired_max_key and shifts < self.max_shift_per_loop:
+                    if len(self.placed_sell_px_to_id) <= 0:
                         break
-                if add_buys or add_sells:
-                    logger.debug("levels補充: add_buys={} add_sells={} now buy={} sell={}", add_buys, add_sells, len(self.placed_buy_px_to_id), len(self.placed_sell_px_to_id))
-            except Exception as e:
-                logger.debug("levels補充スキップ: {}", e)
-            return
-            # 上記でreturnしているため以降は不要な重複ロジックを削除
+                    cancel_ids.append(self.placed_sell_px_to_id.popitem(-1)[1][1])
 
-        # 候補を作る
-        buy_targets = [float(mid_price) - (self.first_offset + i * self.step) for i in range(self.levels)]
-        sell_targets = [float(mid_price) + (self.first_offset + i * self.step) for i in range(self.levels)]
-        logger.debug("ensure(init): P={} X={} N={} buy_targets={} sell_targets={}", mid_price, self.first_offset, self.step, buy_targets, sell_targets)
+                    new_sell_px = nearest_sell - self.step
+                    # 安全: 現在価格の内側には置かない
+                    if self._px_key(new_sell_px) <= mid_key:
+                        break
+                    if self._px_key(new_sell_px) in self.placed_sell_px_to_id:
+                        nearest_sell = new_sell_px
+                        shifts += 1
+                        continue
+                    if not _has_min_gap(self.step_ticks, self.placed_sell_px_to_id, self._px_key(new_sell_px)):
+                        self._log.debug("追従: SELL gap違反でスキップ new_px={}", new_sell_px)
+                        break
+                    legs.append((OrderSide.SELL, new_sell_px))
+                    nearest_sell = new_sell_px
+                    shifts += 1
+                # シフト分の取消・発注はそれぞれ1回のバッチで送る（1本ずつ直列に待たない）
+                await self._cancel_orders(cancel_ids, "追従: 遠いSELL")
+                await self._place_orders(legs)
+                if shifts:
+                    self._log.debug("追従SELL: nearest={} desired_max={} shifts={}", nearest_sell, desired_max_sell, shifts)
+        except Exception as e:
+            self._log.debug("追従SELL処理スキップ: {}", e)
 
-        # 以降はターゲットに合わせて一斉キャンセルは行わない（アンカー方式）
+    async def _place_orders(self, legs: List[Tuple[OrderSide, float]]) -> List[bool]:
+        """複数の指値(POST_ONLY)を1回のバッチで発注し、各レッグが置けたかをlegsと同順で返す."""
+        ok = [False] * len(legs)
+        if not legs:
+            return ok
+        # 価格はキー（価格刻み単位）に正規化してから使う。送信価格・台帳の価格・キーが常に一致し、
+        # 同じ価格帯がfloat誤差で別注文として重複発注されない
+        legs = [(side, self._key_px(self._px_key(px))) for side, px in legs]
 
-        # 片側あたり新規上限が設定されていれば適用
-        new_buys = 0
-        new_sells = 0
+        # シンプルモード以外: 取引所全体の同サイドOPENとの距離チェック（OPEN一覧はループにつき1回だけ取得し、
+        # サイド別の昇順索引を二分探索する）
+        check_active = not self.simple_mode
+        if check_active:
+            try:
+                await self._active_orders_snapshot()
+            except Exception:
+                check_active = False
 
-        # 買い配置（P−X より内側は生成しない設計だが、念のためチェック）
-        for px in buy_targets:
-            if px <= 0:
-                continue
-            if px >= (mid_price - 1e-9):
-                logger.debug("skip(init BUY): inside X (px={} >= P)", px)
-                continue
-            if px in self.placed_buy_px_to_id:
-                logger.debug("skip(init BUY): already placed px={}", px)
+        batch_buys = {self._px_key(px) for side, px in legs if side is OrderSide.BUY}
+        batch_sells = {self._px_key(px) for side, px in legs if side is OrderSide.SELL}
+        idx: List[int] = []
+        reqs: List[OrderRequest] = []
+        for i, (side, price) in enumerate(legs):
+            key = self._px_key(price)
+            # 候補と既存価格の距離がN未満ならスキップ
+            if check_active and _sorted_has_within(self._active_keys[side], key, self.step_ticks):
+                self._log.debug("N間隔未満のためスキップ: side={} cand={}", side, price)
                 continue
-            if not self._has_min_gap(self.placed_buy_px_to_id, px):
-                logger.debug("skip(init BUY): gap < N at px={}", px)
+            # 自己クロス防止: 反対サイド（既存・同一バッチ内）に同値があればスキップ
+            if side is OrderSide.BUY and (key in self.placed_sell_px_to_id or key in batch_sells):
+                self._log.debug("自己クロス回避: BUYをスキップ 価格=${:.1f}", price)
                 continue
-            if self.max_new_per_loop and new_buys >= self.max_new_per_loop:
-                break
-            await self._place_order(OrderSide.BUY, px)
-            new_buys += 1
-            await asyncio.sleep(self.op_spacing_sec)
-            
-        # 売り配置（P＋X より内側は生成しない設計だが、念のためチェック）
-        for px in sell_targets:
-            if px in self.placed_sell_px_to_id:
-                logger.debug("skip(init SELL): already placed px={}", px)
-                continue
-            if not self._has_min_gap(self.placed_sell_px_to_id, px):
-                logger.debug("skip(init SELL): gap < N at px={}", px)
+            if side is OrderSide.SELL and (key in self.placed_buy_px_to_id or key in batch_buys):
+                self._log.debug("自己クロス回避: SELLをスキップ 価格=${:.1f}", price)
                 continue
-            if px <= (mid_price + 1e-9):
-                logger.debug("skip(init SELL): inside X (px={} <= P)", px)
-                continue
-            if self.max_new_per_loop and new_sells >= self.max_new_per_loop:
-                break
-            await self._place_order(OrderSide.SELL, px)
-            new_sells += 1
-            await asyncio.sleep(self.op_spacing_sec)
-            
-        if not self.initialized:
-            self.initialized = True
-            logger.info("初回グリッド配置完了: 買い{}本 売り{}本", 
-                       len(self.placed_buy_px_to_id), len(self.placed_sell_px_to_id))
-
-    async def _place_order(self, side: OrderSide, price: float):
-        """注文を発注"""
-        req = OrderRequest(
-            symbol=self.symbol,
-            side=side,
-            type=OrderType.LIMIT,
-            quantity=self.size,
-            price=price,
-            time_in_force=TimeInForce.POST_ONLY  # ← MAKER注文（手数料リベート）
-        )
-        
+            idx.append(i)
+            reqs.append(self._req_proto[side].model_copy(update={"price": price}))
+        if not reqs:
+            return ok
+
         try:
-            # シンプルモード: 取引所全体の同サイドOPENとの距離チェックを省略（高速化）
-            if not self.simple_mode:
-                try:
-                    active = await self.adapter.list_active_orders(self.symbol)
-                except Exception:
-                    active = []
-                # 候補と既存価格の距離がN未満ならスキップ
-                def _extract_px(row: dict) -> float | None:
-                    try:
-                        raw = row.get("price") or row.get("px") or row.get("0")
-                        return float(raw) if raw is not None else None
-                    except Exception:
-                        return None
-                for row in (active or []):
-                    if not isinstance(row, dict):
-                        continue
-                    # サイド判定（無ければスキップ）
-                    s = str(row.get("side") or row.get("orderSide") or "").upper()
-                    if (side == OrderSide.BUY and s not in ("BUY", "LONG")) or (side == OrderSide.SELL and s not in ("SELL", "SHORT")):
-                        continue
-                    apx = _extract_px(row)
-                    if apx is None:
-                        continue
-                    if abs(apx - price) < (self.step - 1e-9):
-                        logger.debug("N間隔未満のためスキップ: side={} cand={} exist={}", side, price, apx)
-                        return
-
-            # 自己クロス防止: 反対サイドに同値があればスキップ
-            if side == OrderSide.BUY and price in self.placed_sell_px_to_id:
-                logger.debug("自己クロス回避: BUYをスキップ 価格=${:.1f}", price)
-                return
-            if side == OrderSide.SELL and price in self.placed_buy_px_to_id:
-                logger.debug("自己クロス回避: SELLをスキップ 価格=${:.1f}", price)
-                return
-            order = await self.adapter.place_order(req)
-            if side == OrderSide.BUY:
-                self.placed_buy_px_to_id[price] = order.id
-                logger.info("買い注文発注: 価格=${:.1f} ID={}", price, order.id)
+            results = await self._batch_with_retry(self.adapter.place_orders_batch, reqs)
+        except Exception as e:
+            self._log.error("一括発注エラー: {}本 error={}", len(reqs), e)
+            return ok
+        placed_buys: List[Tuple[float, str]] = []
+        placed_sells: List[Tuple[float, str]] = []
+        for i, res in zip(idx, results):
+            side, price = legs[i]
+            if isinstance(res, BaseException):
+                self._log.error("注文発注エラー: side={} price={} error={}", side, price, res)
+                continue
+            if side is OrderSide.BUY:
+                self.placed_buy_px_to_id.add(self._px_key(price), price, res.id)
+                placed_buys.append((price, res.id))
             else:
-                self.placed_sell_px_to_id[price] = order.id
-                logger.info("売り注文発注: 価格=${:.1f} ID={}", price, order.id)
+                self.placed_sell_px_to_id.add(self._px_key(price), price, res.id)
+                placed_sells.append((price, res.id))
+            self._remember_placed(side, price, res.id)
+            ok[i] = True
+        # 発注ログはバッチ毎に1行へまとめる（発注毎の書式化・出力を避ける）
+        if placed_buys:
+            self._log.opt(lazy=True).info("買い注文発注: {}本 {}", lambda: len(placed_buys), lambda: _fmt_orders(placed_buys))
+        if placed_sells:
+            self._log.opt(lazy=True).info("売り注文発注: {}本 {}", lambda: len(placed_sells), lambda: _fmt_orders(placed_sells))
+        return ok
+
+    async def _cancel_orders(self, order_ids: List[str], label: str = "注文") -> List[bool]:
+        """注文をまとめてキャンセルし、各IDが成功したかを同順で返す（失敗は無視してログのみ）."""
+        if not order_ids:
+            return []
+        try:
+            results = await self._batch_with_retry(self.adapter.cancel_orders_batch, order_ids)
         except Exception as e:
-            logger.error("注文発注エラー: side={} price={} error={}", side, price, e)
+            self._log.debug("{}の一括キャンセル失敗(無視): {}", label, e)
+            return [False] * len(order_ids)
+        ok: List[bool] = []
+        for oid, res in zip(order_ids, results):
+            if isinstance(res, BaseException):
+                self._log.debug("{}キャンセル失敗(無視): id={}", label, oid)
+                ok.append(False)
+            else:
+                self._log.info("{}をキャンセル: id={}", label, oid)
+                ok.append(True)
+        # 取り消した注文はこのループのOPEN注文一覧からも外す（余剰整理で二重に取り消さない）
+        done = {oid for oid, flag in zip(order_ids, ok) if flag}
+        if self._active_cache is not None and not done.isdisjoint(self._active_ids):
+            self._active_ids -= done
+            kept = []
+            for row in self._active_cache:
+                if _row_order_id(row) not in done:
+                    kept.append(row)
+                    continue
+                sk = _row_side_key(row, self._px_scale)
+                if sk is not None:
+                    self._active_keys[sk[0]].discard(sk[1])
+            self._active_cache = kept
+        return ok
 
     async def _replenish_if_filled(self):
         """約定した注文を確認し、補充する"""
         # BIN固定モードでは、約定イベントに依存せず ensure_grid が目標集合に揃えるためスキップ
-        if getattr(self, "bin_mode", False):
+        if self.bin_mode:
             return
+        active_orders = None
         try:
-            active_orders = await self.adapter.list_active_orders(self.symbol)
-            # EdgeXアダプタは dict を返すため堅牢にIDを抽出する
-            active_ids = set()
-            for o in active_orders:
-                try:
-                    if isinstance(o, dict):
-                        oid = (
-                            o.get("orderId")
-                            or o.get("id")
-                            or o.get("order_id")
-                            or o.get("clientOrderId")
-                            or o.get("client_order_id")
-                        )
-                    else:
-                        oid = getattr(o, "id", None) or getattr(o, "orderId", None)
-                    if oid:
-                        active_ids.add(str(oid))
-                except Exception:
-                    continue
-            
+            # 注文ストリーム稼働中は通知された約定IDだけを見る。一定間隔ごと（または停止時）はRESTで全件突合
+            now = time.monotonic()
+            if self._order_stream_alive and now - self._last_reconcile_ts < self.reconcile_sec:
+                filled_ids = set()
+                while not self._fill_queue.empty():
+                    filled_ids.add(self._fill_queue.get_nowait())
+
+                gone_buy_ids = self.placed_buy_px_to_id.order_ids() & filled_ids
+                gone_sell_ids = self.placed_sell_px_to_id.order_ids() & filled_ids
+            else:
+                self._last_reconcile_ts = now
+                # ストリーム稼働中は溜まった通知を捨てるため、必ず今の一覧を取り直す（古い一覧だと約定を取りこぼす）
+                active_orders = await self._active_orders_snapshot(fresh=self._order_stream_alive)
+                # RESTの結果が正なので、溜まっている通知は捨てる
+                while not self._fill_queue.empty():
+                    self._fill_queue.get_nowait()
+                # 集合差で約定（=取引所に無くなった）注文IDを求める（一覧のID集合は取得時に作成済み）
+                gone_buy_ids = self.placed_buy_px_to_id.order_ids() - self._active_ids
+                gone_sell_ids = self.placed_sell_px_to_id.order_ids() - self._active_ids
+
             # 買い注文の約定確認
             filled_buy_prices = []
-            for px, oid in list(self.placed_buy_px_to_id.items()):
-                if oid not in active_ids:
-                    logger.info("買い注文約定: 価格=${:.1f} ID={}", px, oid)
-                    filled_buy_prices.append(px)
-            
+            for px, oid in self.placed_buy_px_to_id.pop_orders(gone_buy_ids):
+                self._log.info("買い注文約定: 価格=${:.1f} ID={}", px, oid)
+                filled_buy_prices.append(px)
+
             # 売り注文の約定確認
             filled_sell_prices = []
-            for px, oid in list(self.placed_sell_px_to_id.items()):
-                if oid not in active_ids:
-                    logger.info("売り注文約定: 価格=${:.1f} ID={}", px, oid)
-                    filled_sell_prices.append(px)
-            
-            # 約定した注文を削除
-            for px in filled_buy_prices:
-                del self.placed_buy_px_to_id[px]
-            for px in filled_sell_prices:
-                del self.placed_sell_px_to_id[px]
-            
+            for px, oid in self.placed_sell_px_to_id.pop_orders(gone_sell_ids):
+                self._log.info("売り注文約定: 価格=${:.1f} ID={}", px, oid)
+                filled_sell_prices.append(px)
+
             if filled_buy_prices or filled_sell_prices:
-                logger.info("約定確認完了: 買い{}本 売り{}本", 
+                self._log.info("約定確認完了: 買い{}本 売り{}本", 
                            len(filled_buy_prices), len(filled_sell_prices))
 
             # === アンカー方式の補充ロジック ===
+            # 買い/売りの約定を1パスで処理し、取消と補充レッグはそれぞれ1バッチで送る
+            legs: List[Tuple[OrderSide, float]] = []
+            far_cancel_ids: List[str] = []
             # BUYが約定した場合: 
             #  - 反対側(SELL)の一番遠い指値(最大価格)を1つキャンセル
             #  - SELLを一番近い側に1つ追加（現在の最安SELLよりNだけ内側=より近い価格）
@@ -676,27 +1086,24 @@ class GridEngine:
             if filled_buy_prices:
                 # 反対側の一番遠いSELLをキャンセル
                 if self.placed_sell_px_to_id:
-                    far_sell_px = max(self.placed_sell_px_to_id.keys())
-                    far_sell_id = self.placed_sell_px_to_id.pop(far_sell_px)
-                    try:
-                        await self.adapter.cancel_order(far_sell_id)
-                    except Exception:
-                        logger.debug("cancel far SELL failed (ignore): id={} px={}", far_sell_id, far_sell_px)
-                    await asyncio.sleep(self.op_spacing_sec)
+                    far_cancel_ids.append(self.placed_sell_px_to_id.popitem(-1)[1][1])
                 # SELLを一番近い側に追加
-                base_near_sell = min(self.placed_sell_px_to_id.keys()) if self.placed_sell_px_to_id else (max(filled_buy_prices) + self.step)
+                base_near_sell = self.placed_sell_px_to_id.min_px() if self.placed_sell_px_to_id else (max(filled_buy_prices) + self.step)
                 new_near_sell = base_near_sell - self.step
-                logger.debug("replenish BUY: near_sell_base={} -> new_near_sell={} outer_buy_base(current)={}", base_near_sell, new_near_sell, min(self.placed_buy_px_to_id.keys()) if self.placed_buy_px_to_id else None)
-                if new_near_sell not in self.placed_sell_px_to_id and new_near_sell > 0:
-                    await self._place_order(OrderSide.SELL, new_near_sell)
-                    await asyncio.sleep(self.op_spacing_sec)
+                self._log.opt(lazy=True).debug(
+                    "replenish BUY: near_sell_base={} -> new_near_sell={} outer_buy_base(current)={}",
+                    lambda: base_near_sell,
+                    lambda: new_near_sell,
+                    lambda: self.placed_buy_px_to_id.min_px() if self.placed_buy_px_to_id else None,
+                )
+                if self._px_key(new_near_sell) not in self.placed_sell_px_to_id and new_near_sell > 0:
+                    legs.append((OrderSide.SELL, new_near_sell))
                 # BUYを一番外側に追加
-                base_outer_buy = min(self.placed_buy_px_to_id.keys()) if self.placed_buy_px_to_id else (min(filled_buy_prices) - self.step)
+                base_outer_buy = self.placed_buy_px_to_id.min_px() if self.placed_buy_px_to_id else (min(filled_buy_prices) - self.step)
                 new_outer_buy = base_outer_buy - self.step
-                logger.debug("replenish BUY: base_outer_buy={} -> new_outer_buy={}", base_outer_buy, new_outer_buy)
-                if new_outer_buy > 0 and new_outer_buy not in self.placed_buy_px_to_id:
-                    await self._place_order(OrderSide.BUY, new_outer_buy)
-                    await asyncio.sleep(self.op_spacing_sec)
+                self._log.debug("replenish BUY: base_outer_buy={} -> new_outer_buy={}", base_outer_buy, new_outer_buy)
+                if new_outer_buy > 0 and self._px_key(new_outer_buy) not in self.placed_buy_px_to_id:
+                    legs.append((OrderSide.BUY, new_outer_buy))
 
             # SELLが約定した場合:
             #  - 反対側(BUY)の一番遠い指値(最小価格)を1つキャンセル
@@ -705,76 +1112,101 @@ class GridEngine:
             if filled_sell_prices:
                 # 反対側の一番遠いBUYをキャンセル
                 if self.placed_buy_px_to_id:
-                    far_buy_px = min(self.placed_buy_px_to_id.keys())
-                    far_buy_id = self.placed_buy_px_to_id.pop(far_buy_px)
-                    try:
-                        await self.adapter.cancel_order(far_buy_id)
-                    except Exception:
-                        logger.debug("cancel far BUY failed (ignore): id={} px={}", far_buy_id, far_buy_px)
-                    await asyncio.sleep(self.op_spacing_sec)
+                    far_cancel_ids.append(self.placed_buy_px_to_id.popitem(0)[1][1])
                 # BUYを一番近い側に追加
-                base_near_buy = max(self.placed_buy_px_to_id.keys()) if self.placed_buy_px_to_id else (min(filled_sell_prices) - self.step)
+                base_near_buy = self.placed_buy_px_to_id.max_px() if self.placed_buy_px_to_id else (min(filled_sell_prices) - self.step)
                 new_near_buy = base_near_buy + self.step
-                logger.debug("replenish SELL: near_buy_base={} -> new_near_buy={} outer_sell_base(current)={}", base_near_buy, new_near_buy, max(self.placed_sell_px_to_id.keys()) if self.placed_sell_px_to_id else None)
-                if new_near_buy not in self.placed_buy_px_to_id and new_near_buy > 0:
-                    await self._place_order(OrderSide.BUY, new_near_buy)
-                    await asyncio.sleep(self.op_spacing_sec)
+                self._log.opt(lazy=True).debug(
+                    "replenish SELL: near_buy_base={} -> new_near_buy={} outer_sell_base(current)={}",
+                    lambda: base_near_buy,
+                    lambda: new_near_buy,
+                    lambda: self.placed_sell_px_to_id.max_px() if self.placed_sell_px_to_id else None,
+                )
+                if self._px_key(new_near_buy) not in self.placed_buy_px_to_id and new_near_buy > 0:
+                    legs.append((OrderSide.BUY, new_near_buy))
                 # SELLを一番外側に追加
-                base_outer_sell = max(self.placed_sell_px_to_id.keys()) if self.placed_sell_px_to_id else (max(filled_sell_prices) + self.step)
+                base_outer_sell = self.placed_sell_px_to_id.max_px() if self.placed_sell_px_to_id else (max(filled_sell_prices) + self.step)
                 new_outer_sell = base_outer_sell + self.step
-                logger.debug("replenish SELL: base_outer_sell={} -> new_outer_sell={}", base_outer_sell, new_outer_sell)
-                if new_outer_sell not in self.placed_sell_px_to_id:
-                    await self._place_order(OrderSide.SELL, new_outer_sell)
-                    await asyncio.sleep(self.op_spacing_sec)
-        
+                self._log.debug("replenish SELL: base_outer_sell={} -> new_outer_sell={}", base_outer_sell, new_outer_sell)
+                if self._px_key(new_outer_sell) not in self.placed_sell_px_to_id:
+                    legs.append((OrderSide.SELL, new_outer_sell))
+
+            if far_cancel_ids:
+                await self._cancel_orders(far_cancel_ids, label="遠い注文")
+            if legs:
+                # 同一価格の重複レッグは1本にまとめる
+                legs = list({(side, self._px_key(px)): (side, px) for side, px in legs}.values())
+                await self._place_orders(legs)
+
         except Exception as e:
-            logger.error("約定確認エラー: {}", e)
+            self._log.error("約定確認エラー: {}", e)
             return
 
-        # 余剰オーダーの整理（このBotが出していないOPEN注文を徐々に解消）
-        if self.enforce_levels:
+        # 余剰オーダーの整理（このBotが出していないOPEN注文を徐々に解消）。REST突合したループのみ
+        if self.enforce_levels and active_orders is not None:
             try:
-                placed_ids = set(self.placed_buy_px_to_id.values()) | set(self.placed_sell_px_to_id.values())
-                # 抽出関数
-                def _oid(row: dict) -> str:
-                    return str(row.get("orderId") or row.get("id") or row.get("order_id") or "")
+                placed_ids = self.placed_buy_px_to_id.order_ids() | self.placed_sell_px_to_id.order_ids()
                 # 未管理のOPEN注文
                 unknown = []
                 for row in (active_orders or []):
                     if not isinstance(row, dict):
                         continue
-                    oid = _oid(row)
+                    oid = _row_order_id(row)
                     if not oid or oid in placed_ids:
                         continue
                     status = str(row.get("status") or "").upper()
                     if status and status != "OPEN":
                         continue
                     unknown.append(oid)
-                # 1ループで最大3件だけキャンセルし、徐々に整理
-                for oid in unknown[:3]:
-                    try:
-                        await self.adapter.cancel_order(oid)
-                        logger.info("余剰注文をキャンセル: id={}", oid)
-                    except Exception:
-                        logger.debug("余剰注文キャンセル失敗(無視): id={}", oid)
-                    await asyncio.sleep(self.op_spacing_sec)
+                # 1ループで最大 excess_cancel_per_loop 件だけ1回のバッチでキャンセルし、徐々に整理
+                if unknown:
+                    await self._cancel_orders(unknown[: self.excess_cancel_per_loop], label="余剰注文")
+            except Exception as e:
+                self._log.debug("余剰整理スキップ: {}", e)
+
+    async def _closed_pnl_periodic(self) -> None:
+        """closed_poll_sec 毎にクローズ済みPnLを取り込む（単調時計の締切で周期を保つ）."""
+        next_at = time.monotonic()
+        while self._running:
+            try:
+                await self._poll_closed_pnl_once()
             except Exception as e:
-                logger.debug("余剰整理スキップ: {}", e)
+                self._log.warning("クローズ損益ポーリングエラー: {}", e)
+            next_at = max(next_at + self.closed_poll_sec, time.monotonic())
+            await asyncio.sleep(next_at - time.monotonic())
 
     async def _poll_closed_pnl_once(self):
-        """定期的にクローズ済みPnLを取得"""
-        if self.closed_poll_sec <= 0:
+        """クローズ済みPnLを1回取得し、新規行だけを記録する"""
+        fetch = self._fetch_closed
+        if fetch is None:
+            return
+        try:
+            rows = await fetch(self.symbol)
+        except Exception as e:
+            self._log.error("クローズ済みPnL取得エラー: {}", e)
+            return
+
+        new_rows: list[tuple[int, dict]] = []
+        for row in rows or []:
+            try:
+                rid = int(row.get("id"))
+            except (TypeError, ValueError):
+                # 数値でないIDは順序付けできないため対象外
+                continue
+            if self._last_closed_id is None or rid > self._last_closed_id:
+                new_rows.append((rid, row))
+        if not new_rows:
             return
-        
-        now = time.time()
-        if now - self._last_closed_poll_ts < self.closed_poll_sec:
+        max_id = max(rid for rid, _ in new_rows)
+        if self._last_closed_id is None:
+            # 初回は既存分を基準にするだけ（再起動のたびに過去分を重複記録しない）
+            self._last_closed_id = max_id
+            self._log.debug("closed pnl baseline id={}", max_id)
             return
-        
-        self._last_closed_poll_ts = now
-        
+        self._last_closed_id = max_id
+        new_rows.sort(key=lambda t: t[0])
         try:
-            # ここでクローズ済みPnLを取得する処理を実装
-            # 現在は未実装のため、スキップ
-            pass
+            n = self.tlog.log_closed_rows([row for _, row in new_rows])
+            self._log.info("クローズ損益を記録: {}件 (last_id={})", n, max_id)
         except Exception as e:
-            logger.error("クローズ済みPnL取得エラー: {}", e)
+            self._log.error("クローズ損益の記録に失敗: {}", e)
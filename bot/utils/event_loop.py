@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Coroutine
+
+try:  # 高速イベントループ（未導入・Windowsでは標準のasyncioループのまま）
+    import uvloop
+except ImportError:  # pragma: no cover
+    uvloop = None  # type: ignore[assignment]
+
+
+def run(main: Coroutine[Any, Any, Any]) -> Any:
+    """``main`` をuvloop上で実行する（未導入なら標準の ``asyncio.run``）。
+
+    非推奨の ``uvloop.install()`` でグローバルなポリシーを差し替えず、``uvloop.run()`` を使う。
+    """
+    if uvloop is not None and hasattr(uvloop, "run"):
+        return uvloop.run(main)
+    return asyncio.run(main)
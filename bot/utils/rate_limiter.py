@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Optional
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """指数バックオフの待機秒数（``base*2^attempt`` 秒、上限 ``cap`` 秒）。"""
+    return min(cap, base * (2 ** attempt))
+
+
+class AsyncTokenBucket:
+    """asyncio用のトークンバケット（プロセス内のクライアント側レート制御）。
+
+    ``rate`` 個/秒でトークンを補充し、最大 ``burst`` 個まで貯める。
+    トークンが無い場合は補充されるまで待つ（待機者はFIFO順）。rate<=0 で無効。
+    取引所から429を受けたら :meth:`penalize` でレートを下げ（乗算的減少）、
+    ``cooldown`` 秒後から毎秒 ``rate/10`` ずつ元のレートへ戻す（加算的増加）。
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None, cooldown: float = 10.0) -> None:
+        self.rate = float(rate)
+        self.base_rate = self.rate
+        self.burst = float(burst) if burst and burst > 0 else max(1.0, self.rate)
+        self.cooldown = float(cooldown)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._penalized_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._last
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._last = now
+        if self.rate < self.base_rate and now >= self._penalized_until:
+            self.rate = min(self.base_rate, self.rate + elapsed * self.base_rate / 10.0)
+
+    def penalize(self, factor: float = 0.5) -> None:
+        """レート制限応答を受けたときに呼ぶ。レートを ``factor`` 倍に下げ、貯まったトークンも捨てる."""
+        if self.base_rate <= 0:
+            return
+        self._refill()
+        self.rate = max(self.base_rate * 0.05, self.rate * factor)
+        self._tokens = min(self._tokens, 0.0)
+        self._penalized_until = time.monotonic() + self.cooldown
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+    async def __aenter__(self) -> "AsyncTokenBucket":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        return None
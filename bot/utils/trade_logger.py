@@ -1,18 +1,115 @@
 from __future__ import annotations
 
+import atexit
 import csv
 import os
+import queue
+import threading
 import time
-from typing import Optional, Dict, Any
+from collections import defaultdict
+from typing import IO, Optional, Dict, Any
+
+from loguru import logger
+
+try:  # events.csv の data 列をJSONで書く（未導入なら標準json）
+    import orjson
+
+    def _dumps(obj: Any) -> str:
+        # 非str キーも json と同様に受け付ける（フォールバック時と挙動を揃える）
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+except ImportError:  # pragma: no cover
+    import json
+
+    def _dumps(obj: Any) -> str:
+        return json.dumps(obj, ensure_ascii=False, default=str)
+
+# 1回の書き込みでまとめる最大行数
+_FLUSH_BATCH = 256
 
 
 class TradeLogger:
+    """CSVへの追記ロガー。
+
+    log_* は行をキューに積むだけで戻り、ディスク書き込みはバックグラウンドスレッドが
+    まとめて行う（発注処理のイベントループをファイルI/Oで止めない）。終了時に残りを書き出す。
+    """
+
     def __init__(self, base_dir: str = "logs") -> None:
         self.base_dir = base_dir
         os.makedirs(self.base_dir, exist_ok=True)
         self.orders_path = os.path.join(self.base_dir, "orders.csv")
         self.events_path = os.path.join(self.base_dir, "events.csv")
         self.account_id = os.getenv("EDGEX_ACCOUNT_ID") or os.getenv("EDGEX_API_ID") or ""
+        self._q: "queue.SimpleQueue[Optional[tuple[str, list[str], Dict[str, Any]]]]" = queue.SimpleQueue()
+        # 書き込みスレッド専用: 追記先ファイルは一度だけ開いて使い回す
+        self._files: Dict[str, IO[str]] = {}
+        self._writer = threading.Thread(target=self._drain, name="trade-logger", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def close(self) -> None:
+        """Flush queued rows and stop the writer thread."""
+        if self._writer.is_alive():
+            self._q.put(None)
+            self._writer.join(timeout=5.0)
+
+    def _drain(self) -> None:
+        while True:
+            item = self._q.get()
+            stop = item is None
+            batch = [] if stop else [item]
+            while len(batch) < _FLUSH_BATCH:
+                try:
+                    nxt = self._q.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+            if batch:
+                try:
+                    self._flush(batch)
+                except Exception as e:
+                    logger.error("取引ログの書き込みに失敗: {}行を破棄 error={}", len(batch), e)
+            if stop:
+                for f in self._files.values():
+                    try:
+                        f.close()
+                    except Exception:
+                        pass
+                self._files.clear()
+                return
+
+    def _flush(self, batch: list) -> None:
+        # ファイル毎にまとめて追記し、バッチにつき1回だけflush
+        by_path: Dict[str, tuple[list[str], list[Dict[str, Any]]]] = defaultdict(lambda: ([], []))
+        for path, headers, row in batch:
+            entry = by_path[path]
+            if not entry[0]:
+                entry[0].extend(headers)
+            entry[1].append(row)
+        # ファイル毎に書き込み、1つのファイルの失敗で他のファイルの行を失わない
+        for path, (headers, rows) in by_path.items():
+            try:
+                f = self._files.get(path)
+                if f is None:
+                    file_exists = os.path.exists(path) and os.path.getsize(path) > 0
+                    f = open(path, mode="a", newline="", encoding="utf-8")
+                    self._files[path] = f
+                    if not file_exists:
+                        csv.DictWriter(f, fieldnames=headers).writeheader()
+                csv.DictWriter(f, fieldnames=headers).writerows(rows)
+                f.flush()
+            except Exception as e:
+                logger.error("取引ログの書き込みに失敗: path={} {}行を破棄 error={}", path, len(rows), e)
+                # 壊れたハンドルは捨て、次のバッチで開き直す
+                bad = self._files.pop(path, None)
+                if bad is not None:
+                    try:
+                        bad.close()
+                    except Exception:
+                        pass
 
     @staticmethod
     def _now_ts_ms() -> tuple[str, int]:
@@ -22,12 +119,7 @@ class TradeLogger:
         return ts_iso, ts_ms
 
     def _append_row(self, path: str, headers: list[str], row: Dict[str, Any]) -> None:
-        file_exists = os.path.exists(path) and os.path.getsize(path) > 0
-        with open(path, mode="a", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=headers)
-            if not file_exists:
-                writer.writeheader()
-            writer.writerow(row)
+        self._q.put((path, headers, row))
 
     def log_order(
         self,
@@ -83,9 +175,8 @@ class TradeLogger:
             "account_id": self.account_id,
             "event": event,
             "symbol": symbol,
-            "data": (data or {}),
+            "data": _dumps(data or {}),
         }
-        # DictWriter will convert dict to str; acceptable for quick logs
         self._append_row(self.events_path, headers, row)
 
     def log_pnl(
@@ -158,15 +249,9 @@ class TradeLogger:
             "orderId",
         ]
         appended = 0
-        os.makedirs(self.base_dir, exist_ok=True)
-        file_exists = os.path.exists(path) and os.path.getsize(path) > 0
-        with open(path, "a", newline="", encoding="utf-8") as f:
-            w = csv.DictWriter(f, fieldnames=headers)
-            if not file_exists:
-                w.writeheader()
-            for r in rows:
-                w.writerow({k: r.get(k, "") for k in headers})
-                appended += 1
+        for r in rows:
+            self._append_row(path, headers, {k: r.get(k, "") for k in headers})
+            appended += 1
         return appended
 
 
@@ -4,11 +4,13 @@ Volume Trading Engine
 """
 
 import asyncio
+import time
 from decimal import Decimal
 from loguru import logger
 
-from bot.adapters.base import ExchangeAdapter
+from bot.adapters.base import ExchangeAdapter, RateLimitError
 from bot.models.types import OrderRequest, OrderSide, OrderType, TimeInForce
+from bot.utils.rate_limiter import backoff_delay
 
 
 class VolumeEngine:
@@ -52,6 +54,10 @@ class VolumeEngine:
         # 注文ID
         self.buy_order_id: str | None = None
         self.sell_order_id: str | None = None
+        
+        # 約定待機中の一覧取得がレート制限された時の再試行間隔（指数バックオフ: base*2^n 秒、上限cap秒）
+        self.retry_base_sec = 0.25
+        self.retry_cap_sec = 2.0
 
     async def run(self):
         """メインループ"""
@@ -82,32 +88,32 @@ class VolumeEngine:
         """エントリーフェーズ: 両建て注文を発注"""
         logger.info("=== エントリーフェーズ ===")
         
-        # 現在価格を取得
-        ticker = await self.adapter.get_ticker(self.contract_id)
-        current_price = ticker.price
-        logger.info("現在価格: ${:.1f}", current_price)
-        
-        # エントリー価格を計算
-        buy_price = float(Decimal(str(current_price)) - self.entry_offset_usd)
-        sell_price = float(Decimal(str(current_price)) + self.entry_offset_usd)
-        logger.info("エントリー注文配置: 買い=${:.1f} 売り=${:.1f}", buy_price, sell_price)
-        
-        # 板の事前取得（プリウォーム）: 起動直後の取得失敗で止まらないように
-        try:
-            warmed = False
+        # 現在価格と板を並行取得（板は起動直後の取得失敗で止まらないようにプリウォームも兼ねる）
+        async def _warm_bba() -> tuple[float | None, float | None]:
             for _ in range(5):
                 try:
                     bid, ask = await self.adapter.get_best_bid_ask(self.contract_id)  # type: ignore[attr-defined]
                 except Exception:
                     bid, ask = None, None
                 if bid is not None or ask is not None:
-                    warmed = True
-                    break
+                    return bid, ask
                 await asyncio.sleep(0.5)
-            if not warmed:
-                logger.warning("板の取得に失敗（プリウォーム未成功）。発注を遅延します。")
-        except Exception:
-            pass
+            return None, None
+
+        current_price, (bid, ask) = await asyncio.gather(
+            self.adapter.get_last_price(self.contract_id),
+            _warm_bba(),
+        )
+        logger.info("現在価格: ${:.1f} bid={} ask={}", current_price, bid, ask)
+        if bid is None and ask is None:
+            logger.warning("板の取得に失敗（プリウォーム未成功）。発注を遅延します。")
+
+        # エントリー価格を計算（板が取れていれば買いはbid・売りはaskを基準にする）
+        buy_base = Decimal(str(bid)) if bid is not None else Decimal(str(current_price))
+        sell_base = Decimal(str(ask)) if ask is not None else Decimal(str(current_price))
+        buy_price = float(buy_base - self.entry_offset_usd)
+        sell_price = float(sell_base + self.entry_offset_usd)
+        logger.info("エントリー注文配置: 買い=${:.1f} 売り=${:.1f}", buy_price, sell_price)
 
         # 買い注文
         buy_order_req = OrderRequest(
@@ -146,8 +152,23 @@ class VolumeEngine:
             # 最後にもう一度試す（失敗時は例外を投げる）
             return await self.adapter.place_order(req)
 
-        buy_order = await _place_with_retry(buy_order_req)
-        sell_order = await _place_with_retry(sell_order_req)
+        # 買い/売りは互いに独立しているため同時に発注する（往復待ちを1回分に短縮）
+        buy_order, sell_order = await asyncio.gather(
+            _place_with_retry(buy_order_req),
+            _place_with_retry(sell_order_req),
+            return_exceptions=True,
+        )
+        # 片側だけ失敗した場合、置けた側は取引所に残ったままIDを失う。取り消してから例外を投げ直す
+        for failed, placed, label in ((buy_order, sell_order, "売り"), (sell_order, buy_order, "買い")):
+            if isinstance(failed, BaseException) and not isinstance(placed, BaseException):
+                try:
+                    await self.adapter.cancel_order(placed.id)
+                    logger.warning("片側の発注失敗のため{}注文をキャンセル: ID={}", label, placed.id)
+                except Exception as e:
+                    logger.error("片側発注失敗後の{}注文キャンセルに失敗: ID={} error={}", label, placed.id, e)
+                raise failed
+        if isinstance(buy_order, BaseException):
+            raise buy_order
         
         self.buy_order_id = buy_order.id
         self.sell_order_id = sell_order.id
@@ -156,29 +177,14 @@ class VolumeEngine:
         
         # 約定待機
         logger.info("約定待機中...")
+        # 1秒周期で確認する（取得の往復時間を周期に含め、sleep(1)+RTT で周期が伸びないようにする）
+        next_poll = time.monotonic()
         while True:
-            await asyncio.sleep(1)
+            next_poll = max(next_poll + 1.0, time.monotonic())
+            await asyncio.sleep(max(0.0, next_poll - time.monotonic()))
             
             # アクティブ注文を確認
-            active_orders = await self.adapter.list_active_orders(self.contract_id)
-            # EdgeXアダプタは dict を返すため堅牢にIDを抽出する
-            active_ids = set()
-            for o in active_orders:
-                try:
-                    if isinstance(o, dict):
-                        oid = (
-                            o.get("orderId")
-                            or o.get("id")
-                            or o.get("order_id")
-                            or o.get("clientOrderId")
-                            or o.get("client_order_id")
-                        )
-                    else:
-                        oid = getattr(o, "id", None) or getattr(o, "orderId", None)
-                    if oid:
-                        active_ids.add(str(oid))
-                except Exception:
-                    continue
+            active_ids = await self._active_order_ids()
             
             # 買い注文が約定したか確認
             if self.buy_order_id not in active_ids:
@@ -211,6 +217,42 @@ class VolumeEngine:
         logger.info("ポジション: {} {} @ ${:.1f}", self.position_side, self.position_size, self.position_price)
         logger.info("累計取引量: {} BTC", self.total_volume)
 
+    async def _active_order_ids(self) -> set[str]:
+        """OPEN注文のID集合を取得する.
+
+        レート制限(RateLimitError)は「注文が消えた」とは見なさず、指数バックオフで待って取得し直す
+        （注文やポジションを残したまま約定待機を抜けない）。
+        """
+        attempt = 0
+        while True:
+            try:
+                active_orders = await self.adapter.list_active_orders(self.contract_id)
+                break
+            except RateLimitError as e:
+                delay = backoff_delay(attempt, self.retry_base_sec, self.retry_cap_sec)
+                logger.warning("注文一覧の取得がレート制限: {:.2f}秒後に再取得 error={}", delay, e)
+                await asyncio.sleep(delay)
+                attempt = min(attempt + 1, 16)  # 2^n がfloatで溢れないよう上限で止める（待機はcap秒で頭打ち）
+        # EdgeXアダプタは dict を返すため堅牢にIDを抽出する
+        active_ids: set[str] = set()
+        for o in active_orders:
+            try:
+                if isinstance(o, dict):
+                    oid = (
+                        o.get("orderId")
+                        or o.get("id")
+                        or o.get("order_id")
+                        or o.get("clientOrderId")
+                        or o.get("client_order_id")
+                    )
+                else:
+                    oid = getattr(o, "id", None) or getattr(o, "orderId", None)
+                if oid:
+                    active_ids.add(str(oid))
+            except Exception:
+                continue
+        return active_ids
+
     async def _hold_phase(self):
         """ホールドフェーズ: ポジションを保持"""
         logger.info("=== ポジション保持フェーズ ===")
@@ -226,8 +268,7 @@ class VolumeEngine:
         logger.info("保持時間終了、決済処理開始")
         
         # 現在価格を取得
-        ticker = await self.adapter.get_ticker(self.contract_id)
-        current_price = ticker.price
+        current_price = await self.adapter.get_last_price(self.contract_id)
         
         # エグジット価格を計算
         if self.position_side == "LONG":
@@ -257,28 +298,13 @@ class VolumeEngine:
         
         # 約定待機
         logger.info("決済約定待機中...")
+        next_poll = time.monotonic()
         while True:
-            await asyncio.sleep(1)
+            next_poll = max(next_poll + 1.0, time.monotonic())
+            await asyncio.sleep(max(0.0, next_poll - time.monotonic()))
             
             # アクティブ注文を確認
-            active_orders = await self.adapter.list_active_orders(self.contract_id)
-            active_ids = set()
-            for o in active_orders:
-                try:
-                    if isinstance(o, dict):
-                        oid = (
-                            o.get("orderId")
-                            or o.get("id")
-                            or o.get("order_id")
-                            or o.get("clientOrderId")
-                            or o.get("client_order_id")
-                        )
-                    else:
-                        oid = getattr(o, "id", None) or getattr(o, "orderId", None)
-                    if oid:
-                        active_ids.add(str(oid))
-                except Exception:
-                    continue
+            active_ids = await self._active_order_ids()
             
             # 決済注文が約定したか確認
             if exit_order_id not in active_ids:
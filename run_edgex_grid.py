@@ -1,5 +1,4 @@
 import os
-import asyncio
 import yaml
 from loguru import logger
 from dotenv import load_dotenv
@@ -7,6 +6,7 @@ from urllib.parse import urlparse
 
 from bot.adapters.edgex_sdk import EdgeXSDKAdapter
 from bot.grid_engine import GridEngine
+from bot.utils.event_loop import run
 
 
 async def main() -> None:
@@ -115,7 +115,7 @@ async def main() -> None:
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        run(main())
     except KeyboardInterrupt:
         logger.info("stopped by user")
 
@@ -3,7 +3,6 @@ Volume Trading Bot
 取引量を稼ぐためのボット起動スクリプト
 """
 
-import asyncio
 import os
 from decimal import Decimal
 from loguru import logger
@@ -11,6 +10,7 @@ from dotenv import load_dotenv
 
 from bot.adapters.edgex_sdk import EdgeXSDKAdapter
 from bot.volume_engine import VolumeEngine
+from bot.utils.event_loop import run
 
 
 async def main():
@@ -87,6 +87,6 @@ async def main():
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        run(main())
     except KeyboardInterrupt:
         logger.info("stopped by user")